@@ -2,71 +2,128 @@ import serial
 import time
 from pynput.keyboard import Key, Controller 
 import json
+import statistics
+import sys
+import os
+import threading
+
+# Calibration statistics are shared with the main game
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Game"))
+from CalibrationStats import RoundStats
 
 keyboard = Controller()
 
 CALIBRATION_FILE = "calibration_fourFlexors.json"
+DEFAULT_THRESHOLDS = [700, 800, 600, 850]  # used until the first calibration, same as game_WV_flex_control.py
+
+# Ways of combining all the readings that arrived since the last read into one
+AGGREGATORS = {
+    "latest": lambda readings: readings[-1],
+    "max": lambda readings: [max(channel) for channel in zip(*readings)],
+    "mean": lambda readings: [round(statistics.mean(channel)) for channel in zip(*readings)],
+    "median": lambda readings: [round(statistics.median(channel)) for channel in zip(*readings)],
+}
 
 class FourFlexorsControl:
-    def __init__(self, port='COM3', baud=9600, threshold_mult=0.8):
-        self.arduino = serial.Serial(port, baud, timeout=1)
-        time.sleep(2)  # allow time to connect
+    def __init__(self, port='COM3', baud=9600, threshold_mult=0.8, aggregator="latest", calibrate=True, on_progress=None):
+        """
+        Calibration runs in the background (calibrate=False skips it), until it's done the thresholds from the
+        last calibration file are used, or DEFAULT_THRESHOLDS if there isn't one.
+        on_progress(progress, status) is called from the calibration thread, progress goes from 0 to 1.
+        cancel_calibration() can be called from any thread, on_progress included. From another thread it waits
+        for the calibration to stop, from on_progress it returns straight away and calibration stops after it.
+        """
+        self.arduino = serial.Serial(port, baud, timeout=1)  # the first reads wait for the Arduino to finish booting
 
         self.threshold_mult = threshold_mult
+        self.aggregator = aggregator # how read_sensor combines everything that arrived since the last call
+        self.partial_line = b"" # end of the buffer that isn't a full line yet
         self.sensor_names = ["Up", "Down", "Left", "Right"]
-        self.thresholds = [0, 0, 0, 0]
+        self.thresholds = list(DEFAULT_THRESHOLDS)
         self.sensor_values = [0, 0, 0, 0]
-
-        self.calibrate_all_sensors()
+        self.calibration_stats = [[], [], [], []] # statistics of each calibration round, saved with the thresholds
+        self.load_calibration()
+
+        # Background calibration state
+        self.on_progress = on_progress
+        self.progress = 0.0 # how far calibration has got, 0 to 1 (for UIs that poll instead of using on_progress)
+        self.status = "Not calibrating"
+        self.latest_reading = None # newest reading the calibration thread has seen
+        self._serial_lock = threading.Lock()
+        self._cancel = threading.Event()
+        self._calibration_thread = None
+
+        if calibrate:
+            self.start_calibration()
     
-    def read_sensor(self):
+    def drain_readings(self):
+        """Reads everything waiting on the port in one go and returns every complete reading in it."""
+        with self._serial_lock:
+            data = self.arduino.read(self.arduino.in_waiting or 1)  # waits up to the timeout if nothing is there yet
+        lines = (self.partial_line + data).split(b"\n")
+        self.partial_line = lines.pop()  # keep the unfinished line for next time
+
+        readings = []
+        for line in lines:
+            cleaned_values = [int(v) for v in line.decode(errors="ignore").split() if v.isdigit()]
+            # Ensure we have exactly 4 values 
+            if len(cleaned_values) == 4:
+                readings.append(cleaned_values)
+            elif line.strip():
+                print(f"Incomplete data received: {cleaned_values}, skipping...")
+        if readings:
+            self.latest_reading = readings[-1]
+        return readings
+
+    def read_sensor(self, aggregate=None):
     # """Reads sensor values from Arduino and ensures all expected values are received."""
-        self.arduino.flushInput()  # Clear buffer to reduce partial reads
-
         while True:  # Keep trying until we get a valid full set
-            data = self.arduino.readline().decode().strip()
-            
-            if data:
-                values = data.split()  # Convert to list
-                cleaned_values = []
-
-                for v in values:
-                    if v.isdigit():
-                        cleaned_values.append(int(v))
-
-                # Ensure we have exactly 4 values 
-                if len(cleaned_values) == 4:  
-                    #print(f"Extracted Values: {cleaned_values}")  # Debugging print
-                    return cleaned_values  # Only return when valid data is received to prevent incorrect indexing
-                else:
-                    print(f"Incomplete data received: {cleaned_values}, retrying...")
+            readings = self.drain_readings()
+            if readings:
+                # Only return when valid data is received to prevent incorrect indexing
+                return AGGREGATORS[aggregate or self.aggregator](readings)
+
+    def _report(self, progress, status):
+        self.progress, self.status = progress, status
+        print(status)
+        if self.on_progress:
+            self.on_progress(progress, status)
 
     # Function to calibrate a single sensor
     def calibrate_sensor(self, sensor_index): 
-        """Calibrates one sensor using max values over 5 rounds."""
-        print(f"Calibration started for Sensor {self.sensor_names[sensor_index]}. Recording max values.")
-        time.sleep(3)  
+        """Calibrates one sensor using the 95th percentile of its readings over 5 rounds. Returns None if cancelled."""
+        self._report(sensor_index / 4, f"Calibration started for Sensor {self.sensor_names[sensor_index]}. Recording values.")
+        if self._cancel.wait(3):  # like time.sleep, but wakes up straight away on cancel_calibration()
+            return None
         calibration_values = []
+        stats = []
 
         for i in range(5):
-            max_value = 0
-            print(f"Recording session {i+1}/5.")
+            round_stats = RoundStats(95)  # mean, spread and 95th percentile without keeping every reading
+            self._report((sensor_index + i / 5) / 4, f"{self.sensor_names[sensor_index]}: recording session {i+1}/5.")
+            with self._serial_lock:
+                self.arduino.reset_input_buffer()  # readings from the pause before this round don't count
+                self.partial_line = b""
             start_time = time.time()
 
-            while time.time() - start_time < 3:  # record 3s window, capture highest values
-                values = self.read_sensor()
-               # print("Values: ", values)
-                if values and len(values) > sensor_index:
-                    max_value = max(max_value, values[sensor_index])
+            while time.time() - start_time < 3:  # record 3s window, every reading counts
+                if self._cancel.is_set():
+                    return None
+                readings = self.drain_readings()
+                round_stats.add_batch([values[sensor_index] for values in readings])
 
-            calibration_values.append(max_value) # append to list of max values
-            print(f"Max Value for Sensor {sensor_index}, Round {i+1}: {max_value}")
+            # the percentile instead of the max, so one noise spike doesn't set the threshold
+            calibration_values.append(round_stats.value() or 0)
+            stats.append(round_stats.summary())
+            print(f"Sensor {sensor_index}, Round {i+1}: {round_stats.summary()}")
 
             if i < 4:
                 print("Pausing for 1/2 second before next recording.")
-                time.sleep(0.5)
+                if self._cancel.wait(0.5):
+                    return None
 
         threshold = round(self.threshold_mult*(sum(calibration_values) / len(calibration_values)))
+        self.calibration_stats[sensor_index] = stats
         print(f"Calibration complete for Sensor {sensor_index}. Threshold set to: {threshold:.2f}")
         return threshold
     
@@ -83,28 +140,68 @@ class FourFlexorsControl:
         # print("All sensors calibrated.")
 
     def calibrate_all_sensors(self):
-        """Calibrates all four sensors."""
+        """Calibrates all four sensors, waiting until it's done. Returns False if it was cancelled."""
+        thresholds = list(self.thresholds)
         for sensor_index in range(4):
-            self.thresholds[sensor_index] = self.calibrate_sensor(sensor_index)
+            threshold = self.calibrate_sensor(sensor_index)
+            if threshold is None:
+                self._report(self.progress, "Calibration cancelled, keeping the previous thresholds.")
+                return False
+            thresholds[sensor_index] = threshold
+        self.thresholds = thresholds  # all four switch over at once, the game never sees a half calibrated set
         self.save_calibration()
-        print("All sensors calibrated.")
+        self._report(1.0, "All sensors calibrated.")
+        return True
+
+    def start_calibration(self):
+        """Starts calibrate_all_sensors() in a background thread, the controller keeps working meanwhile."""
+        if self.calibrating:
+            return
+        self._cancel.clear()
+        self._calibration_thread = threading.Thread(target=self.calibrate_all_sensors, daemon=True)
+        self._calibration_thread.start()
+
+    def cancel_calibration(self):
+        """Stops a running calibration, the thresholds stay as they were before it started."""
+        self._cancel.set()
+        # From on_progress this runs on the calibration thread itself, which can't wait for itself to finish
+        if self._calibration_thread is not None and threading.current_thread() is not self._calibration_thread:
+            self._calibration_thread.join()
+
+    @property
+    def calibrating(self):
+        return self._calibration_thread is not None and self._calibration_thread.is_alive()
 
     def get_sensor_outputs(self):
         """Reads sensor values and returns whether each one is above its threshold."""
-        values = self.read_sensor()
+        # While calibrating, the calibration thread does the reading (it needs every reading), use the newest one
+        values = self.latest_reading if self.calibrating else self.read_sensor()
         if values and len(values) >= 4:
             self.sensor_values = values[:4]
             return [1 if self.sensor_values[i] > self.thresholds[i] else 0 for i in range(4)]
         return [0, 0, 0]
     
+    def load_calibration(self):
+        """Loads the thresholds from the last calibration, returns False if there isn't one."""
+        try:
+            with open(CALIBRATION_FILE) as f:
+                calibration_data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        self.thresholds = calibration_data['thresholds']
+        self.calibration_stats = calibration_data.get('rounds', self.calibration_stats)
+        print(f"Loaded thresholds from the last calibration: {self.thresholds}")
+        return True
+
     def save_calibration(self):
         """Saves the current calibration data to the JSON file."""
-        calibration_data = {'thresholds': self.thresholds}
+        calibration_data = {'thresholds': self.thresholds, 'rounds': self.calibration_stats}
         with open(CALIBRATION_FILE, 'w') as f:
             json.dump(calibration_data, f)
     
     def close(self):
-        """Closes the serial connection."""
+        """Stops any calibration and closes the serial connection."""
+        self.cancel_calibration()
         self.arduino.close()
 
     # thank you mr claude for this wonderful visualize function
@@ -120,6 +217,8 @@ if __name__ == "__main__":
     try: 
         while True:
             print("\n" + "Sensor Values".center(50, "="))
+            if controller.calibrating:
+                print(f"{controller.status} ({controller.progress:.0%})")
             sensor_values = controller.get_sensor_outputs() 
             for i in range(4):
                 print(controller.visualize_sensor(controller.sensor_values[i], controller.thresholds[i], controller.sensor_names[i]))  
@@ -0,0 +1,225 @@
+"""
+Pretend Arduino on a pseudo-terminal, for testing the controllers and bridges without hardware (Linux/macOS).
+
+It speaks the same output formats as the sketches in this repository:
+- "flex":          ArduinoFlexController.ino, text lines '512 300 610 898'
+- "flex-binary":   ArduinoFlexController.ino with BINARY_FRAMES on (see FlexProtocol.py)
+- "four-flexors":  Serial_flex_sensor_read.ino, 'flexVal1: 512 flexVal2: 300 ...'
+- "switch":        Serial_switch_read.ino, 'upSwitchState: 1<tab>downSwitchState: 0'
+- "potentiometer": Serial_potentiometer_reader.ino, 'potVal: 512'
+
+Run it on its own and point a controller at the port it prints:
+    python ArduinoEmulator.py four-flexors --rate 200 --jitter 0.002
+    python ../"Keyboard Control"/SerialSwitch.py /dev/pts/5
+Or measure how FlexController keeps up as the sample rate goes up:
+    python ArduinoEmulator.py --bench
+"""
+
+import argparse
+import math
+import os
+import pty
+import random
+import threading
+import time
+import tty
+
+import numpy as np
+
+from FlexProtocol import SampleDecoder, pack_frame
+
+SKETCHES = ["flex", "flex-binary", "four-flexors", "switch", "potentiometer"]
+
+
+# Motion profiles: time in seconds -> [up, down, left, right] readings (0-1023)
+def rest_profile(t):
+    return [300, 320, 280, 310]
+
+def exercise_profile(t):
+    """Flexes up, down, left and right in turn (2 s each, 1 s of rest in between), like a calibration session."""
+    values = rest_profile(t)
+    phase = t % 12
+    sensor, into = int(phase // 3), phase % 3
+    if into < 2:
+        values[sensor] += int(550 * math.sin(math.pi * into / 2))
+    return values
+
+def sine_profile(t):
+    return [int(512 + 400 * math.sin(2 * math.pi * 0.5 * t + i * math.pi / 2)) for i in range(4)]
+
+def counter_profile(t, index):
+    """First channel counts samples (mod 1024), so a reader can work out which sample it got. Used by the benchmark."""
+    return [index % 1024, 320, 280, 310]
+
+PROFILES = {"rest": rest_profile, "exercise": exercise_profile, "sine": sine_profile}
+
+
+class ArduinoEmulator:
+    """
+    Writes sensor output into a pty at a given rate. port is the device name to open with pyserial.
+    jitter is the standard deviation (seconds) added to each sample's send time, drop_rate the
+    chance of losing each byte on the way. baud (optional) caps the bytes per second like a real link.
+    """
+    def __init__(self, sketch="flex", rate=20, jitter=0.0, drop_rate=0.0, profile="exercise", noise=5, baud=None, seed=None):
+        if sketch not in SKETCHES:
+            raise ValueError(f"Unknown sketch {sketch}, pick one of {SKETCHES}")
+        self.sketch = sketch
+        self.rate = rate
+        self.jitter = jitter
+        self.drop_rate = drop_rate
+        self.profile = profile
+        self.noise = noise
+        self.baud = baud
+        self.random = random.Random(seed)
+
+        self.master, self._slave = pty.openpty()
+        tty.setraw(self._slave)
+        os.set_blocking(self.master, False)
+        self.port = os.ttyname(self._slave)
+
+        self.sent = 0 # Samples written
+        self.bytes_dropped = 0 # Lost on purpose (drop_rate) or because the pty buffer was full
+        self.send_times = [] # time.perf_counter() each sample was written, by sample index ("counter" profile only)
+        self._running = False
+        self._thread = None
+
+    def values(self, t, index):
+        if self.profile == "counter":
+            return counter_profile(t, index)
+        values = PROFILES[self.profile](t)
+        return [min(1023, max(0, v + int(self.random.gauss(0, self.noise)))) for v in values]
+
+    def encode(self, index, values):
+        """Formats one sample the way the chosen sketch prints it."""
+        if self.sketch == "flex":
+            return (" ".join(str(v) for v in values) + "\r\n").encode()
+        if self.sketch == "flex-binary":
+            return pack_frame(index, values)
+        if self.sketch == "four-flexors":
+            return (" ".join(f"flexVal{i + 1}: {v}" for i, v in enumerate(values)) + "\r\n").encode()
+        if self.sketch == "switch":
+            up, down = int(values[0] > 600), int(values[1] > 600)
+            return f"upSwitchState: {up}\tdownSwitchState: {down}\r\n".encode()
+        return f"potVal: {values[0]}\r\n".encode()
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+        os.close(self.master)
+        os.close(self._slave)
+
+    def _run(self):
+        start = time.perf_counter()
+        next_due = start
+        byte_budget = 0.0
+        last = start
+        while self._running:
+            now = time.perf_counter()
+            # Everything that's due goes out in one write, like a USB serial adapter batching bytes
+            chunk = bytearray()
+            while next_due <= now:
+                values = self.values(next_due - start, self.sent)
+                chunk += self.encode(self.sent, values)
+                if self.profile == "counter":
+                    self.send_times.append(now)
+                self.sent += 1
+                next_due = start + self.sent / self.rate + (self.random.gauss(0, self.jitter) if self.jitter else 0)
+            if chunk:
+                if self.drop_rate:
+                    kept = bytearray(b for b in chunk if self.random.random() >= self.drop_rate)
+                    self.bytes_dropped += len(chunk) - len(kept)
+                    chunk = kept
+                if self.baud:
+                    byte_budget = min(byte_budget + (now - last) * self.baud / 10, self.baud / 10)
+                    if len(chunk) > byte_budget:
+                        self.bytes_dropped += len(chunk) - int(byte_budget)
+                        chunk = chunk[:int(byte_budget)]
+                    byte_budget -= len(chunk)
+                self._write(bytes(chunk))
+            last = now
+            time.sleep(max(0.0, min(next_due - time.perf_counter(), 0.01)))
+
+    def _write(self, data):
+        try:
+            written = os.write(self.master, data)
+        except BlockingIOError:
+            written = 0
+        self.bytes_dropped += len(data) - written
+
+
+def bench_decoder(samples=20000):
+    """Decoding cost per sample for the text and binary formats, with no serial port involved."""
+    values = np.random.randint(0, 1024, (samples, 4))
+    text = b"".join((" ".join(str(v) for v in row) + "\r\n").encode() for row in values)
+    binary = b"".join(pack_frame(i, row) for i, row in enumerate(values))
+    for name, data in (("text", text), ("binary", binary)):
+        decoder = SampleDecoder()
+        t = time.perf_counter()
+        decoded = 0
+        for i in range(0, len(data), 512): # Roughly what one read gets at high rates
+            decoded += len(decoder.feed(data[i:i + 512])[0])
+        elapsed = time.perf_counter() - t
+        print(f"{name:6} decode: {decoded / elapsed:10.0f} samples/s ({elapsed / decoded * 1e6:.2f} us/sample, {len(data) / samples:.1f} bytes/sample)")
+
+
+def bench_controller(rates=(20, 100, 500, 1000, 2000, 5000), duration=2.0, sketch="flex-binary"):
+    """Runs FlexController against the emulator at each rate and reports delivered rate, loss and latency."""
+    from FlexController import FlexController
+
+    print(f"{'rate':>6} {'received/s':>11} {'lost':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for rate in rates:
+        emulator = ArduinoEmulator(sketch, rate=rate, profile="counter").start()
+        controller = FlexController(emulator.port, buffer_size=int(rate * duration * 2) + 1024)
+        time.sleep(duration)
+        emulator._running = False
+        time.sleep(0.1)
+        samples = controller.recent_samples()
+        controller.close()
+        emulator.stop()
+
+        # Work out which emitted sample each received one was from the counter channel
+        latencies = []
+        index = -1
+        for _, arrival, values in samples:
+            index += (values[0] - index) % 1024 or 1024
+            if index < len(emulator.send_times):
+                latencies.append(arrival - emulator.send_times[index])
+        lost = 1 - len(samples) / max(emulator.sent, 1)
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000 if latencies else (0, 0, 0)
+        print(f"{rate:6} {len(samples) / duration:11.0f} {lost:7.1%} {p50:8.2f} {p95:8.2f} {p99:8.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Emulated sensor Arduino on a pseudo-terminal")
+    parser.add_argument("sketch", nargs="?", default="flex", choices=SKETCHES)
+    parser.add_argument("--rate", type=float, default=20, help="samples per second")
+    parser.add_argument("--jitter", type=float, default=0.0, help="send time jitter (seconds, standard deviation)")
+    parser.add_argument("--drop", type=float, default=0.0, help="chance of dropping each byte")
+    parser.add_argument("--profile", default="exercise", choices=list(PROFILES) + ["counter"])
+    parser.add_argument("--baud", type=int, help="limit throughput to what this baud rate can carry")
+    parser.add_argument("--bench", action="store_true", help="measure FlexController throughput and latency instead")
+    args = parser.parse_args()
+
+    if args.bench:
+        bench_decoder()
+        for sketch in ("flex", "flex-binary"):
+            print(f"\nFlexController with {sketch}:")
+            bench_controller(sketch=sketch)
+    else:
+        emulator = ArduinoEmulator(args.sketch, args.rate, args.jitter, args.drop, args.profile, baud=args.baud).start()
+        print(f"Emulating {args.sketch} at {args.rate} Hz on {emulator.port} (Ctrl+C to stop)")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            emulator.stop()
+            print(f"Sent {emulator.sent} samples, dropped {emulator.bytes_dropped} bytes")
@@ -1,14 +1,63 @@
+// Set to 1 to send compact binary frames instead of text lines (see FlexProtocol.py).
+// Binary frames run at 115200 baud and ~500 Hz, so open FlexController with baud=115200.
+#define BINARY_FRAMES 0
+
+#if BINARY_FRAMES
+const long BAUD = 115200;
+const int SAMPLE_DELAY_MS = 2;
+#else
+const long BAUD = 9600;
+const int SAMPLE_DELAY_MS = 50;
+#endif
+
+byte seq = 0;
+
 void setup() {
-  Serial.begin(9600);
+  Serial.begin(BAUD);
   analogReference(EXTERNAL);
 }
 
+// Frame: 0xA5 0x5A, sequence counter, channel count, channels packed as 10 bits MSB first, checksum
+void sendFrame(int *values, byte count) {
+  byte frame[4 + (16 * 10 + 7) / 8 + 1];
+  byte idx = 0;
+  frame[idx++] = 0xA5;
+  frame[idx++] = 0x5A;
+  frame[idx++] = seq++;
+  frame[idx++] = count;
+
+  unsigned long acc = 0;
+  byte bits = 0;
+  for (byte i = 0; i < count; i++) {
+    acc = (acc << 10) | (values[i] & 0x3FF);
+    bits += 10;
+    while (bits >= 8) {
+      frame[idx++] = (acc >> (bits - 8)) & 0xFF;
+      bits -= 8;
+    }
+  }
+  if (bits > 0) {
+    frame[idx++] = (acc << (8 - bits)) & 0xFF;
+  }
+
+  byte checksum = 0;
+  for (byte i = 2; i < idx; i++) {
+    checksum += frame[i];
+  }
+  frame[idx++] = checksum;
+  Serial.write(frame, idx);
+}
+
 void loop() {
     int sensorValueA0 = analogRead(A0); // Up
     int sensorValueA1 = analogRead(A1); // Down 
     int sensorValueA4 = analogRead(A4); // Left 
     int sensorValueA5 = analogRead(A5); // Right
 
+#if BINARY_FRAMES
+    int values[4] = {sensorValueA0, sensorValueA1, sensorValueA4, sensorValueA5};
+    sendFrame(values, 4);
+#else
     Serial.print(sensorValueA0);
     Serial.print(" ");
 
@@ -20,5 +69,6 @@ void loop() {
 
     Serial.print(sensorValueA5);
     Serial.println();  // This newline signals end-of-line for Python
-    delay(50);
+#endif
+    delay(SAMPLE_DELAY_MS);
 }
@@ -0,0 +1,86 @@
+"""
+Follows the resting level of each flex sensor during a session, to make up for drift.
+
+Flex sensors read higher or lower as the sleeve warms up or shifts on the ankle, which moves the resting
+level and the level a full flex reaches by about the same amount. BaselineTracker keeps a slow moving average
+of each channel while the foot is at rest, and reports how far it has moved since calibration. FlexController
+adds that offset to the thresholds, one whole reading at a time, so the patient doesn't have to recalibrate.
+"""
+
+import math
+
+import numpy as np
+
+
+class BaselineTracker:
+    def __init__(self, channels, time_constant=60.0, warmup=2.0, max_offset=150):
+        """
+        time_constant (seconds of rest) sets how slowly the baseline follows the readings. The first warmup
+        seconds of rest after calibration set the reference level the offsets are measured from.
+        Offsets are capped at max_offset readings either way.
+        """
+        self.time_constant = time_constant
+        self.warmup = warmup
+        self.max_offset = max_offset
+        self.baseline = None # Current resting level of each channel
+        self.reference = None # Resting level when the thresholds were calibrated
+        self.offsets = np.zeros(channels) # baseline - reference, in whole readings
+        self._last_time = None
+
+        # Telemetry, see summary()
+        self.rest_time = 0.0 # Seconds of rest the tracker has learned from since the last rebase()
+        self.updates = 0
+        self.offset_changes = 0 # Times the offsets (and so the thresholds) moved
+        self.max_offsets = np.zeros(channels) # Largest correction either way so far, per channel
+
+    def rebase(self):
+        """Thresholds were just (re)calibrated: start measuring drift from the resting level from here on."""
+        self.reference = None
+        self.rest_time = 0.0
+        self.offsets = np.zeros_like(self.offsets)
+
+    def update(self, values, now, cutoffs=None):
+        """
+        Learns from a reading taken at rest (no direction active). Channels more than half way from their
+        baseline to their cutoff (a sensor flexed to just below its threshold) aren't resting and are left out.
+        Returns True if the offsets changed.
+        """
+        values = np.asarray(values, dtype=float)
+        # Gaps (the foot was moving) don't count as rest time
+        dt = 0.0 if self._last_time is None else min(now - self._last_time, 0.1)
+        self._last_time = now
+        if self.baseline is None:
+            self.baseline = values.copy()
+            return False
+        self.updates += 1
+        self.rest_time += dt
+
+        # Quick average to begin with, then a slow exponential one
+        alpha = max(1 / (self.updates + 1), 1 - math.exp(-dt / self.time_constant))
+        step = alpha * (values - self.baseline)
+        if cutoffs is not None:
+            step = np.where(values < (self.baseline + cutoffs) / 2, step, 0.0)
+        self.baseline += step
+
+        if self.reference is None:
+            if self.rest_time >= self.warmup:
+                self.reference = self.baseline.copy()
+            return False
+        offsets = np.clip(np.rint(self.baseline - self.reference), -self.max_offset, self.max_offset)
+        if np.array_equal(offsets, self.offsets):
+            return False
+        self.offsets = offsets
+        self.offset_changes += 1
+        self.max_offsets = np.maximum(self.max_offsets, np.abs(offsets))
+        return True
+
+    def summary(self):
+        """How much correction happened so far, as a plain dict (for logs and reports)."""
+        return {
+            "offsets": self.offsets.tolist(),
+            "max_offsets": self.max_offsets.tolist(),
+            "baseline": None if self.baseline is None else np.round(self.baseline, 1).tolist(),
+            "reference": None if self.reference is None else np.round(self.reference, 1).tolist(),
+            "rest_seconds": round(self.rest_time, 1),
+            "offset_changes": self.offset_changes,
+        }
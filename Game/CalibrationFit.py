@@ -0,0 +1,235 @@
+"""
+Fits a patient's calibration from recorded sessions (see --record in game.py), no live calibration needed.
+
+The logs only hold raw readings, not what the patient was trying to do, so every sample is labelled from the
+log itself first: each channel's resting level and full flex are taken from low and high percentiles of its
+readings, a channel more than half way between the two counts as flexed and one near its resting level as
+relaxed. Samples in between (the foot on its way up or down) are left out.
+
+From those labels:
+- thresholds are the 95th percentile of each channel's flexed readings, what live calibration would measure
+- the per-direction gains (THRESHOLD_GAINS and STRENGTH_GAINS in SensorClassifier.py) are found with a grid
+  search, scoring how often sensor_outputs() would give the labelled direction, split over every CPU core
+The result is saved as the patient's calibration profile, the game picks it up with --patient.
+    python CalibrationFit.py --patient alice recordings/alice_*.log
+    python CalibrationFit.py --clinic recordings       (one folder of logs per patient, named after them)
+"""
+
+import argparse
+import itertools
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from SensorLog import load_log
+from SensorClassifier import DirectionClassifier, THRESHOLD_GAINS, STRENGTH_GAINS
+from CalibrationStats import RoundStats
+from CalibrationProfiles import ProfileStore
+from FlexController import default_sensor_names
+
+DIRECTION_CHANNELS = np.arange(4) # Fitting assumes the usual wiring, channels 0-3 are up, down, left, right
+THRESHOLD_GAIN_RANGE = (0.5, 1.3)
+STRENGTH_GAIN_RANGE = (0.7, 1.5)
+MIN_FLEX_RANGE = 100 # Readings between rest and full flex for a channel to count as flexed at all
+
+
+def label_samples(values, rest_percentile=10, peak_percentile=99, flexed_at=0.5, relaxed_below=0.25, min_range=MIN_FLEX_RANGE):
+    """
+    Which channels are flexed in each sample (bool, one row per sample) and which samples are clear enough to
+    score on: every channel either flexed or relaxed, and at most two flexed at once (a diagonal).
+    A channel whose full flex is less than min_range readings above its resting level was never really flexed
+    (only noise), all its samples count as relaxed.
+    """
+    values = np.asarray(values, dtype=float)
+    rest = np.percentile(values, rest_percentile, axis=0)
+    peak = np.percentile(values, peak_percentile, axis=0)
+    flex = (values - rest) / np.maximum(peak - rest, 1)
+    flex[:, peak - rest < min_range] = 0
+    flexed = flex > flexed_at
+    clear = ((flex < relaxed_below) | flexed).all(axis=1) & (flexed.sum(axis=1) <= 2)
+    return flexed, clear
+
+
+def load_sessions(paths, max_samples=200_000):
+    """Readings and labels of every log, joined up. Long recordings are thinned out evenly to max_samples."""
+    values, flexed, clear = [], [], []
+    channels = None
+    for path in paths:
+        log = load_log(path)
+        if channels is not None and log["values"].shape[1] != channels:
+            raise ValueError(f"{path} has {log['values'].shape[1]} channels, the other logs {channels}")
+        channels = log["values"].shape[1]
+        session = np.asarray(log["values"], dtype=np.int64)
+        if not len(session):
+            continue
+        # Labelled per log, the resting levels can be different from one session to the next
+        session_flexed, session_clear = label_samples(session)
+        values.append(session)
+        flexed.append(session_flexed)
+        clear.append(session_clear)
+    if not values:
+        raise ValueError("No samples in the logs")
+    values, flexed, clear = np.concatenate(values), np.concatenate(flexed), np.concatenate(clear)
+    if len(values) > max_samples:
+        keep = np.linspace(0, len(values) - 1, max_samples).astype(int)
+        values, flexed, clear = values[keep], flexed[keep], clear[keep]
+    return values, flexed, clear
+
+
+def fit_thresholds(values, flexed, percentile=95, fallback=None):
+    """Threshold and RoundStats summary of each channel from its flexed readings (fallback if it never flexed)."""
+    thresholds, stats = [], []
+    for channel in range(values.shape[1]):
+        readings = values[flexed[:, channel], channel]
+        if not len(readings):
+            if fallback is None:
+                raise ValueError(f"Channel {channel} is never flexed in the logs, can't fit its threshold")
+            thresholds.append(float(fallback[channel]))
+            stats.append([])
+            continue
+        round_stats = RoundStats(percentile)
+        round_stats.add_batch(readings)
+        # Exact percentile here, the whole recording is in memory anyway
+        thresholds.append(float(np.percentile(readings, percentile)))
+        stats.append([round_stats.summary()])
+    return thresholds, stats
+
+
+def gain_grid(steps=5):
+    """
+    Grid values for the threshold gains and the strength gains. Only the ratios between strength gains matter,
+    so up's stays at 1 and only the other three are searched.
+    """
+    threshold_gains = np.round(np.linspace(*THRESHOLD_GAIN_RANGE, steps), 3).tolist()
+    strength_gains = np.round(np.linspace(*STRENGTH_GAIN_RANGE, max(steps - 2, 2)), 3).tolist()
+    return (list(itertools.product(threshold_gains, repeat=4)),
+            [(1.0,) + sg for sg in itertools.product(strength_gains, repeat=3)])
+
+
+# Set up once in each worker process, so the samples aren't sent along with every task
+_data = None
+
+
+def _init_worker(rest_values, flex_values, flex_expected, thresholds, threshold_multiplier):
+    global _data
+    _data = (rest_values, flex_values, flex_expected, thresholds, threshold_multiplier)
+
+
+def score(threshold_gains, strength_gains_list):
+    """
+    Balanced accuracy (the mean of the share right at rest and the share right while flexing) of each of the
+    strength gains with these threshold gains. Rest only depends on the threshold gains, so it's done once.
+    """
+    rest_values, flex_values, flex_expected, thresholds, threshold_multiplier = _data
+    classifier = DirectionClassifier(thresholds, DIRECTION_CHANNELS, threshold_multiplier, threshold_gains)
+    rest_score = (rest_values[:, DIRECTION_CHANNELS] <= classifier.cutoffs).all(axis=1).mean()
+    scores = []
+    for strength_gains in strength_gains_list:
+        classifier.gains = np.asarray(strength_gains, dtype=float)
+        flex_score = (classifier.classify(flex_values) == flex_expected).all(axis=1).mean()
+        scores.append((rest_score + flex_score) / 2)
+    return scores
+
+
+def _score_task(task):
+    threshold_gains, strength_gains_list = task
+    return [(s, threshold_gains, sg) for s, sg in zip(score(threshold_gains, strength_gains_list), strength_gains_list)]
+
+
+def _closeness(tg, sg):
+    """How far gains are from the defaults, to break ties towards the defaults."""
+    return (np.abs(np.log(np.divide(tg, THRESHOLD_GAINS))).sum() +
+            np.abs(np.log(np.divide(sg, STRENGTH_GAINS))).sum())
+
+
+def fit_patient(paths, workers=None, steps=5, threshold_multiplier=0.9, max_samples=200_000, fallback=None):
+    """Fits thresholds and gains to the logs. Returns a calibration record for ProfileStore.save()."""
+    start = time.perf_counter()
+    values, flexed, clear = load_sessions(paths, max_samples)
+    thresholds, stats = fit_thresholds(values, flexed, fallback=fallback)
+    expected = flexed[:, DIRECTION_CHANNELS]
+    rest_rows = clear & ~expected.any(axis=1)
+    flex_rows = clear & expected.any(axis=1)
+    if not rest_rows.any() or not flex_rows.any():
+        raise ValueError("The logs need both rest and flexes to fit the gains")
+    data = (values[rest_rows], values[flex_rows], expected[flex_rows], thresholds, threshold_multiplier)
+
+    # One task per set of threshold gains, each tries every set of strength gains
+    threshold_grid, strength_grid = gain_grid(steps)
+    tasks = [(tg, strength_grid) for tg in threshold_grid]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        _init_worker(*data)
+        results = [r for task in tasks for r in _score_task(task)]
+    else:
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=data) as pool:
+            chunksize = max(1, len(tasks) // (workers * 8))
+            results = [r for task_results in pool.map(_score_task, tasks, chunksize=chunksize) for r in task_results]
+    best, tg, sg = max(results, key=lambda r: (r[0], -_closeness(r[1], r[2])))
+
+    _init_worker(*data)
+    default_score = score(THRESHOLD_GAINS, [STRENGTH_GAINS])[0]
+    return {
+        "sensor_names": default_sensor_names(values.shape[1]),
+        "thresholds": thresholds,
+        "calibration_stats": stats,
+        "threshold_gains": list(tg),
+        "strength_gains": list(sg),
+        "fit": {"logs": [os.path.basename(p) for p in paths], "samples": int(len(values)),
+                "scored_samples": int(clear.sum()), "candidates": len(results),
+                "score": round(float(best), 4), "default_gains_score": round(float(default_score), 4),
+                "seconds": round(time.perf_counter() - start, 1)},
+    }
+
+
+def clinic_patients(directory):
+    """{patient: [log paths]} for a folder with one subfolder of .log files per patient."""
+    patients = {}
+    for name in sorted(os.listdir(directory)):
+        folder = os.path.join(directory, name)
+        if os.path.isdir(folder):
+            logs = sorted(os.path.join(folder, f) for f in os.listdir(folder) if f.endswith(".log"))
+            if logs:
+                patients[name] = logs
+    return patients
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fits calibration profiles from recorded sensor logs")
+    parser.add_argument("logs", nargs="*", help="logs of the patient given with --patient")
+    parser.add_argument("--patient", help="patient the logs belong to")
+    parser.add_argument("--clinic", metavar="DIR", help="fit every patient, DIR has one folder of logs per patient")
+    parser.add_argument("--profiles", metavar="DIR", help="where the profiles are (the game's profiles folder by default)")
+    parser.add_argument("--workers", type=int, help="processes to search with (default: one per CPU core)")
+    parser.add_argument("--steps", type=int, default=5, help="grid points per gain, the search grows as steps^4 * (steps-2)^3")
+    parser.add_argument("--max-samples", type=int, default=200_000, help="thin out longer recordings to this many samples")
+    parser.add_argument("--dry-run", action="store_true", help="print the fits without saving them")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if args.clinic:
+        patients = clinic_patients(args.clinic)
+    elif args.patient and args.logs:
+        patients = {args.patient: args.logs}
+    else:
+        parser.error("give --patient with some logs, or --clinic")
+    store = ProfileStore(args.profiles) if args.profiles else ProfileStore()
+
+    for patient, paths in patients.items():
+        previous = store.get(patient)
+        try:
+            record = fit_patient(paths, args.workers, args.steps, max_samples=args.max_samples,
+                                 fallback=previous["thresholds"] if previous else None)
+        except ValueError as e:
+            print(f"{patient}: not fitted, {e}")
+            continue
+        fit = record["fit"]
+        print(f"{patient}: {len(paths)} logs, {fit['samples']} samples, {fit['candidates']} candidates in {fit['seconds']}s")
+        print(f"  thresholds {[round(t) for t in record['thresholds']]}, threshold gains {record['threshold_gains']}, "
+              f"strength gains {record['strength_gains']}")
+        print(f"  score {fit['score']:.3f} (default gains {fit['default_gains_score']:.3f})")
+        if not args.dry_run:
+            store.save(patient, record)
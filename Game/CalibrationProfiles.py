@@ -0,0 +1,110 @@
+"""
+Calibration profiles, one per patient, so a returning patient can start playing straight away.
+
+Each patient gets a JSON file in the profiles folder holding their thresholds, the statistics behind them
+and a short history of earlier calibrations. Files are replaced atomically (written to a temporary file
+first), so a crash or power cut mid-save never leaves a half-written profile. Profiles are only read from
+disk the first time they're asked for, after that they come from memory.
+"""
+
+import json
+import logging
+import os
+import re
+import tempfile
+import time
+
+from SensorClassifier import THRESHOLD_GAINS, STRENGTH_GAINS
+
+PROFILE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "profiles")
+FORMAT_VERSION = 1 # Bump when the layout of a profile changes
+HISTORY_LENGTH = 20 # Earlier calibrations kept in each profile
+
+
+def safe_patient_id(patient):
+    """Patient IDs become file names, so anything but letters, digits, - and _ is replaced."""
+    return re.sub(r"[^A-Za-z0-9_-]", "_", str(patient)) or "default"
+
+
+class ProfileStore:
+    def __init__(self, directory=PROFILE_DIR):
+        self.directory = directory
+        self._cache = {} # patient -> profile (or None if there's no file), filled on first access
+
+    def path(self, patient):
+        return os.path.join(self.directory, safe_patient_id(patient) + ".json")
+
+    def patients(self):
+        """IDs of every patient with a saved profile."""
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(name[:-5] for name in os.listdir(self.directory) if name.endswith(".json"))
+
+    def get(self, patient):
+        """The patient's profile as a dict, or None if they haven't been calibrated yet."""
+        if patient not in self._cache:
+            self._cache[patient] = self._load(patient)
+        return self._cache[patient]
+
+    def _load(self, patient):
+        try:
+            with open(self.path(patient)) as f:
+                profile = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logging.error(f"Could not read the profile of {patient}: {e}")
+            return None
+        if profile.get("format", 0) > FORMAT_VERSION:
+            logging.error(f"The profile of {patient} was saved by a newer version of the game, ignoring it")
+            return None
+        return profile
+
+    def save(self, patient, calibration):
+        """Saves a new calibration for the patient, keeping the previous one in the history. Returns the profile."""
+        previous = self.get(patient)
+        history = []
+        if previous is not None:
+            history = previous.get("history", []) + [{key: previous[key] for key in ("revision", "saved", "thresholds")}]
+        profile = dict(calibration, format=FORMAT_VERSION, patient=str(patient),
+                       revision=previous["revision"] + 1 if previous else 1,
+                       saved=time.strftime("%Y-%m-%dT%H:%M:%S"), history=history[-HISTORY_LENGTH:])
+
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(profile, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path(patient)) # Atomic, readers see either the old file or the new one
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        self._cache[patient] = profile
+        logging.info(f"Saved calibration profile {profile['revision']} for {patient}")
+        return profile
+
+
+def calibration_record(controller):
+    """What gets saved from a calibrated controller."""
+    return {
+        "sensor_names": list(controller.sensor_names),
+        "thresholds": [float(t) for t in controller.thresholds],
+        "calibration_stats": getattr(controller, "calibration_stats", []),
+        "threshold_gains": list(getattr(controller, "threshold_gains", THRESHOLD_GAINS.tolist())),
+        "strength_gains": list(getattr(controller, "strength_gains", STRENGTH_GAINS.tolist())),
+    }
+
+
+def apply_profile(controller, profile):
+    """Gives the controller the profile's thresholds. False if the profile is for a sleeve with other sensors."""
+    if list(profile.get("sensor_names", [])) != list(controller.sensor_names):
+        logging.warning(f"Profile sensors {profile.get('sensor_names')} don't match the sleeve's {controller.sensor_names}, "
+                        "calibration needed")
+        return False
+    controller.thresholds = list(profile["thresholds"])
+    # Profiles from before gains could be fitted (see CalibrationFit.py) use the defaults
+    controller.threshold_gains = tuple(profile.get("threshold_gains", THRESHOLD_GAINS.tolist()))
+    controller.strength_gains = tuple(profile.get("strength_gains", STRENGTH_GAINS.tolist()))
+    return True
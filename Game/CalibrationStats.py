@@ -0,0 +1,140 @@
+"""
+Streaming statistics for calibration rounds.
+
+A round sees every sample of the sensor being calibrated, but only keeps a handful of numbers: count, mean and
+variance (Welford's method), min/max and a high percentile estimated with the P² algorithm (Jain & Chlamtac).
+Thresholds come from that percentile rather than the maximum, so a single noise spike can't push them up.
+Used by FlexController.py and by FourFlexorsControl in "Game with Prior Calibration + Flex Sensor Control".
+"""
+
+import math
+
+import numpy as np
+
+
+class RunningStats:
+    """Count, mean, variance, min and max of a stream of numbers, in constant memory."""
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0 # Sum of squared differences from the mean
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, x):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+        self.min = min(self.min, x)
+        self.max = max(self.max, x)
+
+    def add_batch(self, values):
+        """Same result as add() for each value, but merges the whole batch at once (Chan et al.)."""
+        values = np.asarray(values, dtype=float)
+        if not len(values):
+            return
+        batch_mean = float(values.mean())
+        batch_m2 = float(((values - batch_mean) ** 2).sum())
+        count = self.count + len(values)
+        delta = batch_mean - self.mean
+        self.mean += delta * len(values) / count
+        self.m2 += batch_m2 + delta ** 2 * self.count * len(values) / count
+        self.count = count
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+    @property
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+
+class P2Quantile:
+    """Estimates the p quantile (0-1) of a stream with five markers, without storing the stream."""
+    def __init__(self, p=0.95):
+        self.p = p
+        self.initial = [] # The first five values, until the markers can be set up
+        self.heights = None
+        self.positions = None
+        self.desired = None
+        self.increments = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def add(self, x):
+        if self.heights is None:
+            self.initial.append(x)
+            if len(self.initial) == 5:
+                self.heights = sorted(self.initial)
+                self.positions = [0, 1, 2, 3, 4]
+                self.desired = [0, 2 * self.p, 4 * self.p, 2 + 2 * self.p, 4]
+            return
+
+        q, n = self.heights, self.positions
+        # Find the cell x falls in, stretching the outer markers if it's a new min or max
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= q[k + 1]:
+                k += 1
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+
+        # Move the middle markers towards where they should be
+        for i in range(1, 4):
+            d = self.desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                height = q[i] + d / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i]) +
+                    (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+                if not q[i - 1] < height < q[i + 1]: # Parabolic guess out of order, fall back to linear
+                    height = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                q[i] = height
+                n[i] += d
+
+    def add_batch(self, values):
+        for x in np.asarray(values, dtype=float).tolist():
+            self.add(x)
+
+    def value(self):
+        """The estimate, or None before any values. Exact while there are five values or fewer."""
+        if self.heights is None:
+            return float(np.percentile(self.initial, self.p * 100)) if self.initial else None
+        return self.heights[2]
+
+
+class RoundStats:
+    """Everything recorded about one calibration round of one sensor."""
+    def __init__(self, percentile=95):
+        self.percentile = percentile
+        self.stats = RunningStats()
+        self.quantile = P2Quantile(percentile / 100)
+
+    def add_batch(self, values):
+        self.stats.add_batch(values)
+        self.quantile.add_batch(values)
+
+    @property
+    def count(self):
+        return self.stats.count
+
+    def value(self):
+        """The reading this round counts for towards the threshold (its high percentile)."""
+        return self.quantile.value()
+
+    def summary(self):
+        """Plain dict for saving next to the thresholds, so the quality of a calibration can be checked later."""
+        if not self.stats.count:
+            return {"samples": 0}
+        return {"samples": self.stats.count, "mean": round(self.stats.mean, 1), "std": round(self.stats.std, 1),
+                "min": int(self.stats.min), "max": int(self.stats.max), f"p{self.percentile}": round(self.value(), 1)}
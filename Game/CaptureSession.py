@@ -0,0 +1,156 @@
+"""
+cProfile and tracemalloc captures of the running game, for slowdowns and memory growth on clinic machines.
+
+A capture runs for a bounded window (or until it's stopped, F7 in game.py) and then writes, named after the
+session: NAME.prof (open with pstats or snakeviz), NAME.snapshot (tracemalloc.Snapshot.load) and NAME.txt, a
+readable report with the slowest functions and the memory allocated during the capture by each watched region
+of code (the sprite classes and the HUD in game.py), with the top allocation sites in each.
+"""
+
+import cProfile
+import inspect
+import io
+import logging
+import os
+import pstats
+import time
+import tracemalloc
+
+TRACE_FRAMES = 25 # Deep enough to see which sprite a load_image_convert_alpha() call was for
+
+
+def code_regions(*objects):
+    """{name: (file, first line, last line)} for classes and functions, for CaptureSession(regions=...)."""
+    regions = {}
+    for obj in objects:
+        try:
+            lines, first = inspect.getsourcelines(obj)
+            regions[obj.__name__] = (os.path.abspath(inspect.getsourcefile(obj)), first, first + len(lines) - 1)
+        except (OSError, TypeError) as e:
+            logging.warning(f"Can't find the source of {obj!r}, its allocations won't be reported: {e}")
+    return regions
+
+
+class CaptureSession:
+    def __init__(self, directory, name, cpu=True, memory=True, seconds=60, regions=None, top=10):
+        """
+        Files go to directory as NAME_1.prof, NAME_2.prof... one set per capture. seconds=0 captures until
+        stop(). regions (see code_regions()) are the parts of the code memory growth is broken down by.
+        """
+        self.directory = directory
+        self.name = name
+        self.cpu = cpu
+        self.memory = memory
+        self.seconds = seconds
+        self.regions = regions or {}
+        self.top = top
+        self.captures = 0
+        self.profile = None
+        self._start_snapshot = None
+        self._started_at = None
+
+    @property
+    def active(self):
+        return self._started_at is not None
+
+    def start(self):
+        if self.active:
+            return
+        self.captures += 1
+        if self.memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(TRACE_FRAMES)
+            self._start_snapshot = tracemalloc.take_snapshot()
+        if self.cpu:
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+        self._started_at = time.perf_counter()
+        logging.info(f"Capture {self.captures} started" + (f" for {self.seconds:g} s" if self.seconds else ""))
+
+    def update(self):
+        """Called once a frame, ends the capture when its window is over."""
+        if self.active and self.seconds and time.perf_counter() - self._started_at >= self.seconds:
+            self.stop()
+
+    def toggle(self):
+        if self.active:
+            self.stop()
+        else:
+            self.start()
+
+    def stop(self):
+        """Ends the capture and writes its files. Returns their paths."""
+        if not self.active:
+            return []
+        if self.profile is not None:
+            self.profile.disable()
+        duration = time.perf_counter() - self._started_at
+        self._started_at = None
+        os.makedirs(self.directory, exist_ok=True)
+        base = os.path.join(self.directory, f"{self.name}_{self.captures}")
+        paths = []
+        report = [f"Capture {self.captures} of {self.name}: {duration:.1f} s", ""]
+
+        memory_report = []
+        if self.memory:
+            # Before the profile is written, so writing it doesn't show up as allocations
+            snapshot = tracemalloc.take_snapshot().filter_traces([
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, cProfile.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            ])
+            tracemalloc.stop()
+            snapshot.dump(base + ".snapshot")
+            paths.append(base + ".snapshot")
+            memory_report = self._memory_report(snapshot)
+            self._start_snapshot = None
+
+        if self.profile is not None:
+            self.profile.dump_stats(base + ".prof")
+            paths.append(base + ".prof")
+            stream = io.StringIO()
+            pstats.Stats(self.profile, stream=stream).sort_stats("cumulative").print_stats(self.top * 2)
+            report += ["Slowest functions (cumulative time)", stream.getvalue()]
+            self.profile = None
+        report += memory_report
+
+        with open(base + ".txt", "w") as f:
+            f.write("\n".join(report) + "\n")
+        paths.append(base + ".txt")
+        logging.info(f"Capture {self.captures} saved to {', '.join(paths)}")
+        return paths
+
+    def _region_of(self, traceback):
+        """The watched region and frame an allocation came from, looking from the innermost frame out."""
+        for frame in reversed(traceback): # tracemalloc lists the oldest frame first
+            path = os.path.abspath(frame.filename)
+            for region, (file, first, last) in self.regions.items():
+                if path == file and first <= frame.lineno <= last:
+                    return region, frame
+        return None, None
+
+    def _memory_report(self, snapshot):
+        growth = snapshot.compare_to(self._start_snapshot, "traceback")
+        lines = ["Memory allocated during the capture, by region (still held at the end, net of frees)"]
+        by_region = {region: [] for region in self.regions}
+        for stat in growth:
+            region, frame = self._region_of(stat.traceback)
+            if region is not None and stat.size_diff:
+                by_region[region].append((stat, frame))
+        for region, stats in by_region.items():
+            size = sum(stat.size_diff for stat, _ in stats)
+            count = sum(stat.count_diff for stat, _ in stats)
+            lines.append(f"  {region:14} {size / 1024:+10.1f} KiB in {count:+d} blocks")
+            # Same line reached from different call paths counts once per site
+            sites = {}
+            for stat, frame in stats:
+                key = (frame.filename, frame.lineno)
+                site_size, site_count = sites.get(key, (0, 0))
+                sites[key] = (site_size + stat.size_diff, site_count + stat.count_diff)
+            for (filename, lineno), (site_size, site_count) in sorted(sites.items(), key=lambda s: -abs(s[1][0]))[:self.top]:
+                lines.append(f"      {os.path.basename(filename)}:{lineno:<5} {site_size / 1024:+10.1f} KiB {site_count:+d} blocks")
+
+        lines += ["", "Top allocation sites overall"]
+        for stat in snapshot.compare_to(self._start_snapshot, "lineno")[:self.top]:
+            lines.append(f"  {stat}")
+        return lines
@@ -0,0 +1,115 @@
+"""
+asyncio transport for the sensor sleeve.
+
+The serial port's file descriptor is handed to the event loop, which calls SensorStreamProtocol.data_received()
+whenever bytes arrive. No thread and no poll/sleep loop is needed, so acquisition can share one event loop with
+logging or exporting tasks. Works on POSIX serial ports (and ptys), Windows COM ports have no selectable fd.
+
+    stream = await open_sensor_stream("/dev/ttyACM0")
+    async for arrival_time, values in stream:
+        ...
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+
+import serial
+
+from FlexProtocol import SampleDecoder
+
+
+class SensorStreamProtocol(asyncio.Protocol):
+    """Decodes bytes as they arrive and queues batches of (arrival time, values, device seqs)."""
+    def __init__(self, channels=4, max_batches=1024):
+        self.decoder = SampleDecoder(channels)
+        self.batches = deque(maxlen=max_batches) # Oldest batches are dropped if nobody is consuming
+        self.transport = None
+        self.closed = False
+        self._waiter = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def data_received(self, data):
+        values, device_seqs = self.decoder.feed(data)
+        if len(values):
+            self.batches.append((time.perf_counter(), values, device_seqs))
+            self._wake()
+
+    def eof_received(self):
+        return False
+
+    def connection_lost(self, exc):
+        if exc is not None:
+            logging.error(f"Sensor stream lost: {exc}")
+        self.closed = True
+        self._wake()
+
+    def _wake(self):
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    async def next_batch(self):
+        """Waits for the next decoded batch. Returns None once the port is closed."""
+        while not self.batches:
+            if self.closed:
+                return None
+            self._waiter = asyncio.get_running_loop().create_future()
+            await self._waiter
+        return self.batches.popleft()
+
+
+class SensorStream:
+    """Async iterator over (arrival time, values) samples from one serial port."""
+    def __init__(self, arduino, transport, protocol, owns_port):
+        self.arduino = arduino
+        self.transport = transport
+        self.protocol = protocol
+        self._owns_port = owns_port
+        self._pending = deque()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while not self._pending:
+            batch = await self.protocol.next_batch()
+            if batch is None:
+                raise StopAsyncIteration
+            arrival_time, values, _ = batch
+            self._pending.extend((arrival_time, row) for row in values.tolist())
+        return self._pending.popleft()
+
+    async def batches(self):
+        """Yields whole (arrival time, values, device seqs) batches, cheaper than going sample by sample."""
+        while True:
+            batch = await self.protocol.next_batch()
+            if batch is None:
+                return
+            yield batch
+
+    def close(self):
+        self.transport.close()
+        if self._owns_port:
+            self.arduino.close()
+
+
+async def open_sensor_stream(port, baud=9600, channels=4):
+    """
+    Opens a sensor stream on the running event loop. port is either a port name or an already
+    open serial.Serial (which is then left open when the stream closes).
+    """
+    owns_port = not isinstance(port, serial.Serial)
+    arduino = serial.Serial(port, baud, timeout=0) if owns_port else port
+    try:
+        pipe = os.fdopen(arduino.fileno(), "rb", buffering=0, closefd=False)
+    except (AttributeError, OSError) as e:
+        if owns_port:
+            arduino.close()
+        raise RuntimeError(f"{arduino.port} has no file descriptor the event loop can watch") from e
+    loop = asyncio.get_running_loop()
+    transport, protocol = await loop.connect_read_pipe(lambda: SensorStreamProtocol(channels), pipe)
+    return SensorStream(arduino, transport, protocol, owns_port)
@@ -1,39 +1,305 @@
-import serial, os, logging, json, pygame
+import serial, logging, pygame, threading, time, argparse
+import numpy as np
+from collections import deque
+from FlexProtocol import SampleDecoder
+from FlexAsync import open_sensor_stream
+from SensorLog import SensorRecorder, load_log
+from SensorFilters import FilterPipeline, step_latency
+from SensorClassifier import DirectionClassifier, velocity_tables, THRESHOLD_GAINS, STRENGTH_GAINS
+from CalibrationStats import RoundStats
+from BaselineTracker import BaselineTracker
+from SensorTelemetry import SensorTelemetry
 
-logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
+CAL_ROUNDS = 3 # Calibration rounds per sensor
+
+# Directions sensor_outputs() reports, in this order
+DIRECTIONS = ["Up", "Down", "Left", "Right"]
+# Which channel (position in the Arduino's output) drives each direction, for the four sensor sleeve
+DEFAULT_CHANNEL_MAP = {"Up": 0, "Down": 1, "Left": 2, "Right": 3}
+
+# Ways of reducing every sample that arrived since the last read (one row per sample) to a single reading
+AGGREGATORS = {
+    "latest": lambda batch: batch[-1],
+    "max": lambda batch: batch.max(axis=0),
+    "mean": lambda batch: np.rint(batch.mean(axis=0)),
+    "median": lambda batch: np.rint(np.median(batch, axis=0)),
+}
+
+def default_sensor_names(channels=4):
+    """Names for a sleeve with this many channels: the four directions, then numbered extras."""
+    return DIRECTIONS[:channels] + [f"Ch{i + 1}" for i in range(len(DIRECTIONS), channels)]
+
+class Debouncer:
+    """
+    On/off state of every channel, updated all at once. A channel turns on above its cutoff but only turns off again
+    at or below cutoff * (1 - hysteresis), and once it has changed it holds for at least min_hold seconds.
+    With both at 0 a channel is simply on whenever it's above its cutoff.
+    """
+    def __init__(self, channels, hysteresis=0.0, min_hold=0.0):
+        self.hysteresis = hysteresis
+        self.min_hold = min_hold
+        self.active = np.zeros(channels, dtype=bool)
+        self.changed_at = np.full(channels, -np.inf)
+        self.transitions = np.zeros(channels, dtype=np.int64) # On/off changes per channel, to measure flicker
+
+    def update(self, values, cutoffs, now):
+        wanted = np.where(self.active, values > cutoffs * (1 - self.hysteresis), values > cutoffs)
+        change = (wanted != self.active) & (now - self.changed_at >= self.min_hold)
+        self.active ^= change
+        self.changed_at[change] = now
+        self.transitions += change
+        return self.active
 
-CALIBRATION_FILE = "FlexController_Calibration.json"
 
 class FlexController:
-    def __init__(self, port ='COM6', baud=9600): 
-        self.arduino = serial.Serial(port, baud, timeout=1)
+    def __init__(self, port ='COM6', baud=9600, buffer_size=256, max_sample_age=0.5, aggregator="latest", reader="thread",
+                 sensor_names=None, channel_map=None, filters=None, sample_rate=20,
+                 hysteresis=0.0, min_hold=0.0, cal_percentile=95,
+                 drift_time_constant=None, telemetry_size=3600, telemetry_every=1): 
+        # Short timeout so the reader thread can notice close() quickly.
+        # port=None gives a controller without a serial port, its samples are pushed in by something else (see ReplayFlexController)
+        self.arduino = serial.Serial(port, baud, timeout=0.1) if port is not None else None
 
-        self.sensor_values = [0, 0, 0, 0]
-        self.thresholds = [0, 0, 0, 0]
-        self.sensor_names = ["Up","Down","Left","Right"]
+        # One entry per channel the Arduino sends, in the order it sends them. Newer sleeves can have more
+        # sensors than directions, channel_map says which channel drives each direction (the rest are only shown).
+        self.sensor_names = list(sensor_names or default_sensor_names())
+        self.channel_count = len(self.sensor_names)
+        self.channel_map = dict(channel_map or DEFAULT_CHANNEL_MAP)
+        if set(self.channel_map) != set(DIRECTIONS) or not all(0 <= c < self.channel_count for c in self.channel_map.values()):
+            raise ValueError(f"channel_map needs a channel (0-{self.channel_count - 1}) for each of {DIRECTIONS}")
+        self.direction_channels = np.array([self.channel_map[d] for d in DIRECTIONS])
+        self.sensor_values = np.zeros(self.channel_count, dtype=np.int64)
+        # Follows each sensor's resting level and moves the thresholds with it (drift_time_constant=None turns it off)
+        self.baseline = BaselineTracker(self.channel_count, drift_time_constant) if drift_time_constant else None
+        self.thresholds = np.zeros(self.channel_count)
+        # Per-direction tweaks [up, down, left, right], the defaults unless a fitted profile says otherwise
+        self.threshold_gains = tuple(THRESHOLD_GAINS.tolist())
+        self.strength_gains = tuple(STRENGTH_GAINS.tolist())
+        self.classifier = None # DirectionClassifier for the current thresholds, see sensor_outputs()
+        self._classifier_key = None
+        self.velocity_tables = None # Reading -> speed for each channel, see sensor_velocities()
+        self._velocity_key = None
+        self.cutoffs = np.zeros(self.channel_count) # Reading each channel has to pass to count as active
+        # What sensor_outputs() saw and decided in the last telemetry_size frames (telemetry_size=0 turns it off)
+        self.telemetry = SensorTelemetry(self.channel_count, telemetry_size, telemetry_every) if telemetry_size else None
+        # Stops a reading hovering around its cutoff from flickering on and off, see Debouncer
+        self.debouncer = Debouncer(self.channel_count, hysteresis, min_hold)
 
         self.cal_values = []
         self.cal_start = None
-        self.calibration_values = []
-        self.current_sensor = 0 # Tracks which sensor is being calibrated. Goes up to 4. When at 4, stop and reset. 
-        self.cal_round = 0 # Tracks which round of calibration a sensor is on. Goes up to 5. 
-        
+        self.calibration_values = [] # High percentile (cal_percentile) of each finished round for the sensor being calibrated
+        self.cal_percentile = cal_percentile
+        self.round_stats = None # Streaming statistics of the current round, see CalibrationStats.py
+        self.round_summaries = [] # Statistics of each finished round for the sensor being calibrated
+        self.calibration_stats = [[] for _ in range(self.channel_count)] # Per-round statistics behind each threshold
+        self.current_sensor = 0 # Tracks which sensor is being calibrated. Goes up to channel_count. When there, stop and reset. 
+        self.cal_round = 0 # Tracks which round of calibration a sensor is on. Goes up to cal_rounds. 
+        self.cal_rounds = CAL_ROUNDS
+        # Set to a saved profile's thresholds for a quick check instead of a full calibration (see start_verification)
+        self.verify_thresholds = None
+        self.verify_tolerance = 0.15
+
+        # Acquisition state. The reader (thread or asyncio task) is the only writer, the game loop only takes snapshots.
+        self.max_sample_age = max_sample_age # Samples older than this (seconds) count as no reading in sensor_outputs
+        self.latest_values = None # Most recent parsed sample
+        self.latest_time = None # time.perf_counter() when the latest sample arrived
+        self.sample_seq = 0 # Increments once per parsed sample, so callers can tell if they've seen a sample before
+        self.read_seq = 0 # seq of the newest sample behind the last read_sensor() result
+        self.read_time = None # and its arrival time, carried through to the screen for latency measurements
+        self.samples = deque(maxlen=buffer_size) # Ring buffer of (seq, arrival time, values)
+        self.frames_dropped = 0 # Gaps in the Arduino's own sequence counter (binary frames only)
+        self.decoder = SampleDecoder(channels=self.channel_count) # Accepts both the text lines and the binary frames
+        # Optional smoothing of every sample before it's stored, e.g. filters=["median:5", "ema:0.3"] (see SensorFilters.py).
+        # sample_rate (Hz) is what the Arduino sends at, low-pass cutoffs depend on it.
+        self.filters = FilterPipeline(filters, self.channel_count, sample_rate) if filters else None
+        if self.filters is not None:
+            logging.info(f"Sensor filters {filters} delay a flex by about {step_latency(filters, sample_rate):.0f} ms")
+        self.aggregator = aggregator # How read_sensor() combines the samples since the last call, see AGGREGATORS
+        self._read_seq = 0 # Last sample read_sensor() has combined
+        self._cal_seq = 0 # Last sample calibrate_sensor() has looked at
+        self.batch_time = None
+        self._device_seq = None
+        self.error = None # Set when the serial port fails (e.g. the cable was pulled), see connected
+        self._lock = threading.Lock()
+        self._running = True
+        self._stream = None
+        self._reader = None
+        self.recorder = None # SensorRecorder logging every raw sample, see start_recording()
+        # reader="asyncio" leaves acquisition to run_async(), to be run as a task on the caller's event loop
+        if reader == "thread" and self.arduino is not None:
+            self._reader = threading.Thread(target=self._read_loop, daemon=True)
+            self._reader.start()
+
+    def _read_loop(self):
+        """Background thread: keeps reading from the Arduino into the latest-sample slot and ring buffer."""
+        while self._running:
+            try:
+                # Take everything that's waiting in one go, or wait (up to the timeout) for the next byte
+                data = self.arduino.read(self.arduino.in_waiting or 1)
+            except (serial.SerialException, OSError) as e:
+                if self._running:
+                    logging.error(f"Serial read failed, stopping reader: {e}")
+                    self.error = e
+                break
+            if not data:
+                continue
+            values, device_seqs = self.decoder.feed(data)
+            if len(values):
+                self._store_samples(values, time.perf_counter(), device_seqs)
+
+    async def run_async(self):
+        """
+        asyncio backend: feeds the controller from an event loop instead of the reader thread.
+        Create the controller with reader="asyncio" and run this as a task, it returns when the port closes.
+        """
+        self._stream = await open_sensor_stream(self.arduino, channels=self.decoder.channels)
+        self.decoder = self._stream.protocol.decoder
+        async for arrival_time, values, device_seqs in self._stream.batches():
+            self._store_samples(values, arrival_time, device_seqs)
+        if self._running:
+            self.error = serial.SerialException("sensor stream closed")
+
+    @property
+    def thresholds(self):
+        return self._thresholds
+
+    @thresholds.setter
+    def thresholds(self, values):
+        # Always kept as an array, however it's assigned (e.g. a list loaded from a file)
+        self._thresholds = np.array(values, dtype=float)
+        if self.baseline is not None:
+            self.baseline.rebase() # Drift counts from the resting level these thresholds go with
+
+    @property
+    def active(self):
+        """Which channels are currently on, after hysteresis and hold time (updated by sensor_outputs())."""
+        return self.debouncer.active
+
+    @property
+    def transitions(self):
+        """How many times each channel has switched on or off so far."""
+        return self.debouncer.transitions
+
+    @property
+    def drift(self):
+        """How much the thresholds have been moved to follow sensor drift (see BaselineTracker.summary()), or None."""
+        return self.baseline.summary() if self.baseline is not None else None
+
+    def effective_thresholds(self):
+        """The calibrated thresholds plus the drift correction so far."""
+        if self.baseline is None:
+            return self.thresholds
+        return self.thresholds + self.baseline.offsets
+
+    @property
+    def connected(self):
+        """False once the serial port has failed. A sleeve that's gone quiet shows up in sample_age() instead."""
+        return self.error is None
+
+    def adopt_settings(self, other):
+        """
+        Takes over thresholds and other per-session settings from another controller, e.g. the one
+        that was in use before the sleeve was unplugged (see FlexSupervisor.py).
+        """
+        thresholds = getattr(other, "thresholds", self.thresholds)
+        if len(thresholds) == self.channel_count:
+            self.thresholds = thresholds
+        self.aggregator = getattr(other, "aggregator", self.aggregator)
+        self.max_sample_age = getattr(other, "max_sample_age", self.max_sample_age)
+        self.threshold_gains = getattr(other, "threshold_gains", self.threshold_gains)
+        self.strength_gains = getattr(other, "strength_gains", self.strength_gains)
+        # Same sleeve, same drift: keep the learned resting levels (after the thresholds, which rebase it)
+        baseline = getattr(other, "baseline", None)
+        if baseline is not None and self.baseline is not None and len(baseline.offsets) == self.channel_count:
+            self.baseline = baseline
+        # Keep the frames from before the sleeve dropped out, they're usually the interesting ones
+        telemetry = getattr(other, "telemetry", None)
+        if telemetry is not None and self.telemetry is not None and telemetry.channels == self.channel_count:
+            self.telemetry = telemetry
+
+    def _store_samples(self, values, arrival_time, device_seqs=None):
+        """Adds a batch of decoded samples (one row per sample) that all arrived at arrival_time."""
+        if device_seqs is not None and len(device_seqs):
+            # The Arduino's counter wraps at 256, any jump bigger than 1 means frames were lost on the way
+            previous = self._device_seq if self._device_seq is not None else device_seqs[0] - 1
+            gaps = (np.diff(device_seqs, prepend=previous) - 1) % 256
+            self.frames_dropped += int(gaps.sum())
+            self._device_seq = int(device_seqs[-1])
+        raw = values
+        if self.filters is not None:
+            values = self.filters.process(values) # Calibration and classification both see the smoothed samples
+        rows = values.tolist()
+        with self._lock:
+            if self.recorder is not None:
+                self.recorder.write(raw, arrival_time) # Logs stay raw, so a replay can try other filters
+            for row in rows:
+                self.sample_seq += 1
+                self.samples.append((self.sample_seq, arrival_time, row))
+            self.latest_values = rows[-1]
+            self.latest_time = arrival_time
+
+    def read_sensor(self, aggregate=None):
         """
-        self.last_sensor_read_time = 0
-        self.cached_sensor_values = [0, 0, 0, 0]
+        Returns the most recent sensor values sent by the Arduino (say '0 300 600 900' -> [0, 300, 600, 900]).
+        Text lines and binary frames are both accepted, see FlexProtocol.py.
+        Never waits on the serial port, the reader thread keeps the latest sample up to date.
+        With aggregate (or self.aggregator) set to "max", "mean" or "median", every sample that arrived since
+        the previous call is combined instead of only looking at the latest one.
+        Returns None if nothing has arrived yet.
         """
+        aggregate = aggregate or self.aggregator
+        if aggregate != "latest":
+            batch, self._read_seq = self.read_batch(self._read_seq)
+            if len(batch):
+                self.read_seq, self.read_time = self._read_seq, self.batch_time
+                return AGGREGATORS[aggregate](batch).astype(int).tolist()
+        with self._lock:
+            if self.latest_values is None:
+                return None
+            self.read_seq, self.read_time = self.sample_seq, self.latest_time
+            return list(self.latest_values)
 
-    def read_sensor(self):
-        """Reads sensor values from Arduino as a space-separated string (say '0 300 600 900 1200')."""
-        self.arduino.flushInput()
-        data = self.arduino.readline().decode().strip()
-        if data: # If data is not False or Empty
-            #logging.debug(f"Raw sensor data: {data}")
-            values = data.split()
-            return [int(v) for v in values if v.isdigit()] # returns from function all integers from the arduino output
-        else: 
+    def read_batch(self, since_seq=0):
+        """
+        Returns (values, last_seq): every buffered sample newer than since_seq as an array with one row per
+        sample (oldest first), and the seq to pass in next time to continue from there.
+        """
+        rows = []
+        with self._lock:
+            for seq, _, row in reversed(self.samples):
+                if seq <= since_seq:
+                    break
+                rows.append(row)
+            last_seq = self.sample_seq
+            self.batch_time = self.latest_time # Arrival time of the newest sample in the batch
+        rows.reverse()
+        return np.array(rows, dtype=np.int64).reshape(-1, self.decoder.channels), last_seq
+
+    def sample_age(self):
+        """Seconds since the latest sample arrived, or None if nothing has arrived yet."""
+        latest_time = self.latest_time
+        if latest_time is None:
             return None
-        
+        return time.perf_counter() - latest_time
+
+    def recent_samples(self, since_seq=0):
+        """Returns the buffered (seq, arrival time, values) samples newer than since_seq, oldest first."""
+        with self._lock:
+            return [sample for sample in self.samples if sample[0] > since_seq]
+
+    def start_recording(self, path):
+        """Starts appending every raw sample, with its arrival time, to a sensor log (see SensorLog.py)."""
+        self.stop_recording()
+        self.recorder = SensorRecorder(path, channels=self.decoder.channels)
+        logging.info(f"Recording sensor samples to {path}")
+
+    def stop_recording(self):
+        with self._lock: # Make sure the reader isn't half way through a write
+            recorder, self.recorder = self.recorder, None
+        if recorder is not None:
+            recorder.close()
+            logging.info(f"Recorded {recorder.count} samples to {recorder.path}")
+
     def calibrate_sensor(self):
         """
         Calibrates a sensor at a time, updating the current sensor index to match.
@@ -42,35 +308,49 @@ class FlexController:
         True and False flag when a calibration round is over, prompting the game loop implementation to rest or not. 
         """
         values = self.read_sensor()
-        if not values or len(values) < 4:
+        if not values or len(values) < self.channel_count:
             return values, False
         
         if self.cal_start is None:
             self.cal_start = pygame.time.get_ticks() / 1000.0
+            self._cal_seq = self.sample_seq # Samples from before the round started don't count
+            self.round_stats = RoundStats(self.cal_percentile)
 
-        
-
-        if self.current_sensor < 4:
-            # Update calibration value for the current sensor
-            # Reset calibration values when moving to a new sensor
-            if self.cal_round == 0:
-                self.calibration_values = []  # Reset for new sensor
-
-            if len(self.calibration_values) <= self.current_sensor:
-                self.calibration_values.append(values[self.current_sensor])
-            else:
-                # Keep the maximum value during this round
-                self.calibration_values[self.current_sensor] = max(values[self.current_sensor],
-                                                                    self.calibration_values[self.current_sensor])
+        if self.current_sensor < self.channel_count:
+            # Statistics over every sample since the last call, not just the one shown on screen this frame.
+            # The round counts for its high percentile rather than its max, so one noise spike can't skew it.
+            batch, self._cal_seq = self.read_batch(self._cal_seq)
+            self.round_stats.add_batch(batch[:, self.current_sensor])
             elapsed = pygame.time.get_ticks() / 1000.0 - self.cal_start
 
             if elapsed >= 3:  # 3 seconds per calibration round    
+                summary = self.round_stats.summary()
+                self.calibration_values.append(self.round_stats.value() if self.round_stats.count else values[self.current_sensor])
+                self.round_summaries.append(summary)
+                logging.info(f"{self.sensor_names[self.current_sensor]} round {self.cal_round + 1}: {summary}")
+                self.round_stats = None
                 self.cal_round += 1
-                if self.cal_round > 2:  # 3 rounds complete for this sensor
+                if self.cal_round >= self.cal_rounds:  # All rounds complete for this sensor
                     threshold = sum(self.calibration_values) / len(self.calibration_values)
+                    if self.verify_thresholds is not None:
+                        stored = self.verify_thresholds[self.current_sensor]
+                        if abs(threshold - stored) <= self.verify_tolerance * stored:
+                            logging.info(f"{self.sensor_names[self.current_sensor]} threshold {stored:.0f} verified ({threshold:.0f} now)")
+                            threshold = stored
+                        else:
+                            logging.info(f"{self.sensor_names[self.current_sensor]} threshold changed from {stored:.0f} to {threshold:.0f}")
                     self.thresholds[self.current_sensor] = threshold
+                    self.calibration_stats[self.current_sensor] = self.round_summaries
+                    self.calibration_values = []  # Reset for next sensor
+                    self.round_summaries = []
                     self.cal_round = 0
                     self.current_sensor += 1
+                    if self.current_sensor >= self.channel_count:
+                        # Verification is a one-off, the next calibration is a full one again
+                        self.verify_thresholds = None
+                        self.cal_rounds = CAL_ROUNDS
+                        if self.baseline is not None:
+                            self.baseline.rebase()
                     logging.debug(f"Moving to next sensor: {self.current_sensor}")
                     logging.debug(f"Updated thresholds: {self.thresholds}")
 
@@ -86,78 +366,66 @@ class FlexController:
         return values, False
 
     
-    def sensor_outputs(self, threshold_multiplier=0.9):
+    def _update_sensor_values(self):
         # Update sensor_values with the most recent reading
         values = self.read_sensor()
-        if values and len(values) >= 4:
-            self.sensor_values = values[:4]
-        else:
-            self.sensor_values = [0, 0, 0, 0]
+        age = self.sample_age()
+        if values and len(values) >= self.channel_count and age is not None and age <= self.max_sample_age:
+            self.sensor_values = np.array(values[:self.channel_count], dtype=np.int64)
+            return True
+        # Nothing has arrived recently, treat it like a failed read
+        self.sensor_values = np.zeros(self.channel_count, dtype=np.int64)
+        return False
 
-        # Initialize empty outputs
-        outputs = [0, 0, 0, 0]
-        
-        # All this just to make sure the values we're using are the ones the controller has
-        up_val, down_val, left_val, right_val = self.sensor_values
-        up_thresh, down_thresh, left_thresh, right_thresh = [t * threshold_multiplier for t in self.thresholds]
-        
-        # Apply a higher threshold for up direction and lower for right
-        up_thresh = up_thresh * 1.1  # Make "up" less sensitive
-        right_thresh = right_thresh * 0.85  # Make "right" more sensitive
-        
-        # Calculate just how far above the (9% of)threshold each sensor is
-        up_strength = (up_val - up_thresh) / max(up_thresh, 1)
-        down_strength = (down_val - down_thresh) / max(down_thresh, 1)
-        left_strength = (left_val - left_thresh) / max(left_thresh, 1)
-        right_strength = (right_val - right_thresh) / max(right_thresh, 1)
-        
-        # Boost right sensitivity
-        right_strength = right_strength * 1.2
-        
-        strengths = {
-            0: up_strength,
-            1: down_strength, 
-            2: left_strength,
-            3: right_strength
-        }
-        
-        if all(strength < 0 for strength in strengths.values()):
-            return outputs # No sensors are active
-        
+    def _update_classifier(self, thresholds, threshold_multiplier):
+        # Thresholds only change with calibration (or a whole reading of drift), the classifier is rebuilt when they do
+        key = (thresholds.tobytes(), threshold_multiplier, self.threshold_gains, self.strength_gains)
+        if key != self._classifier_key:
+            self.classifier = DirectionClassifier(thresholds, self.direction_channels, threshold_multiplier,
+                                                  self.threshold_gains, self.strength_gains)
+            self._classifier_key = key
+            # Direction channels use the classifier's cutoffs (with the up/right tweaks), any others the plain ones
+            self.cutoffs = thresholds * threshold_multiplier
+            self.cutoffs[self.direction_channels] = self.classifier.cutoffs
 
-        # Creates a dictionary of active sensors (with for keys their index) and their respective strength (as values in the dic)
-        active_sensors = {i: s for i, s in strengths.items() if s > 0}
-        # if the dictionary is not empty, the output sensor is the one with the highest strength
-        if active_sensors:
-            strongest_sensor = max(active_sensors.items(), key=lambda x: x[1])[0] # key lambda x: x[1] tells the max function to 
-            # look at the second item (the value) in the dictionary when looking for maximums
-            # [0] at the end of the line specifies what max should yield is the index, in position 0, and not the value, even though that's
-            # what we used for comparison. 
-            outputs[strongest_sensor] = 1
-        
-        # COMMENT OUT: Special case for up-right combination: prefer right if it's strong enough. EDIT this value if NECESSARY. 
-        if up_strength > 0 and right_strength > 0 and right_strength >= 0.8 * up_strength:
-            outputs = [0, 0, 0, 1]  # Only activate right
-        # If two sensors are active, the output is the combination of the two, IF its an UP-DOWN/LEFT-RIGHT combination, 
-        # and only if the UP/DOWN sensor is stronger than the LEFT/RIGHT sensor
-        elif up_strength > 0 and left_strength > 0 and up_strength > down_strength:
-            outputs[0] = 1
-            outputs[2] = 1
-        elif up_strength > 0 and right_strength > 0 and up_strength > down_strength:
-            outputs[0] = 1
-            outputs[3] = 1
-        elif down_strength > 0 and left_strength > 0 and down_strength > up_strength:
-            outputs[1] = 1
-            outputs[2] = 1
-        elif down_strength > 0 and right_strength > 0 and down_strength > up_strength:
-            outputs[1] = 1
-            outputs[3] = 1
-        
-        logging.debug(f"Sensor values: {self.sensor_values}")
-        logging.debug(f"Strengths: {strengths}")
-        logging.debug(f"Outputs: {outputs}")
-        
+    def sensor_outputs(self, threshold_multiplier=0.9):
+        fresh = self._update_sensor_values()
+        thresholds = self.effective_thresholds()
+        self._update_classifier(thresholds, threshold_multiplier)
+        now = time.perf_counter()
+        active = self.debouncer.update(self.sensor_values, self.cutoffs, now)
+        outputs = self.classifier.classify_one(self.sensor_values, active[self.direction_channels].tolist())
+        # Only learn the resting level while the foot is at rest
+        if fresh and self.baseline is not None and not active.any():
+            self.baseline.update(self.sensor_values, now, self.cutoffs)
+        if self.telemetry is not None:
+            self.telemetry.record(now, self.sensor_values, self.classifier.last_strengths, outputs)
         return outputs
+
+    def sensor_velocities(self, dead_zone=0.5, curve=1.5, threshold_multiplier=0.9):
+        """
+        Proportional alternative to sensor_outputs(): speeds [up, down, left, right] from 0 to 1 depending on how
+        far each sensor is flexed towards its calibrated threshold (see velocity_tables() in SensorClassifier.py).
+        Which sensors count as active (the HUD markers) is still tracked with the same cutoffs as sensor_outputs().
+        """
+        fresh = self._update_sensor_values()
+        thresholds = self.effective_thresholds()
+        # The tables only change with calibration (or drift), per frame this is a lookup
+        key = (thresholds.tobytes(), dead_zone, curve)
+        if key != self._velocity_key:
+            self.velocity_tables = velocity_tables(thresholds, dead_zone, curve)
+            self._velocity_key = key
+        readings = np.clip(self.sensor_values[self.direction_channels], 0, 1023)
+        velocities = self.velocity_tables[self.direction_channels, readings].tolist()
+        self._update_classifier(thresholds, threshold_multiplier)
+        now = time.perf_counter()
+        self.debouncer.update(self.sensor_values, self.cutoffs, now)
+        if fresh and self.baseline is not None and not any(velocities):
+            self.baseline.update(self.sensor_values, now, thresholds * dead_zone)
+        if self.telemetry is not None:
+            # The speeds go in as the strengths, outputs are whether each direction moves at all
+            self.telemetry.record(now, self.sensor_values, velocities, [v > 0 for v in velocities])
+        return velocities
     
 
     """
@@ -172,32 +440,119 @@ class FlexController:
   
 
 
+    def start_verification(self, thresholds, rounds=1, tolerance=0.15):
+        """
+        Next calibration only checks saved thresholds: one round per sensor by default. A threshold within
+        tolerance (fraction) of the saved one keeps the saved value, otherwise the new one replaces it.
+        """
+        self.verify_thresholds = np.array(thresholds, dtype=float)
+        self.cal_rounds = rounds
+        self.verify_tolerance = tolerance
+
     def cal_reset(self):
         """Resets calibration process state but keeps the thresholds."""
         logging.warning("Resetting calibration process state.")
         self.current_sensor = 0
         self.calibration_values = []
+        self.round_stats = None
+        self.round_summaries = []
         self.cal_round = 0
         self.cal_start = None
 
     def close(self):
-        """Closes the serial connection."""
-        self.arduino.close()
-        logging.info("Serial connection closed.")
+        """Stops the reader and closes the serial connection."""
+        self._running = False
+        if self._reader is not None:
+            self._reader.join(timeout=1)
+        if self._stream is not None:
+            self._stream.close()
+        self.stop_recording()
+        if self.arduino is not None:
+            self.arduino.close()
+            logging.info("Serial connection closed.")
 
-    def visualize_sensor(self, name, value, threshold, width=20): 
+    def visualize_sensor(self, name, value, threshold, width=20, active=None): 
         bar = "█" * int((value / 1023) * width)
         bar = bar.ljust(width, "░")
-        active = "ACTIVE" if value > 0.9*threshold else "      "
+        if active is None: # Not given the debounced state (see active), just compare
+            active = value > 0.9*threshold
+        active = "ACTIVE" if active else "      "
         return f"{name:5}: {bar} {value:4}/{threshold:.0f} {active}"
 
 
+class ReplayFlexController(FlexController):
+    """
+    Plays a recorded sensor log back through the normal FlexController interface, no sleeve needed.
+    speed=1.0 replays in real time, 2.0 twice as fast and so on. speed=None replays as fast as possible:
+    every read_sensor() call moves on by exactly one sample, which makes runs fully deterministic.
+    """
+    def __init__(self, path, speed=1.0, loop=False, **kwargs):
+        log = load_log(path)
+        kwargs.setdefault("sensor_names", default_sensor_names(log["values"].shape[1])) # As many channels as were recorded
+        super().__init__(port=None, **kwargs)
+        self.log = log
+        self.log_times = self.log["time"]
+        self.speed = speed
+        self.loop = loop
+        self.position = 0 # Next record to replay
+        self.finished = False
+        self._start = None
+
+    def _advance(self, step=False):
+        """Pushes the records that are due by now (or the next one when stepping) into the controller."""
+        if self.finished or not len(self.log):
+            return
+        now = time.perf_counter()
+        if self._start is None:
+            self._start = now # Playback starts on the first read
+        if self.speed is None:
+            if not step:
+                return
+            end = self.position + 1
+            arrival_time = now
+        else:
+            first_time = self.log_times[0]
+            end = int(np.searchsorted(self.log_times, first_time + (now - self._start) * self.speed, side="right"))
+            arrival_time = self._start + (self.log_times[end - 1] - first_time) / self.speed
+        if end > self.position:
+            self._store_samples(np.asarray(self.log["values"][self.position:end], dtype=np.int64), arrival_time)
+            self.position = end
+        if self.position >= len(self.log):
+            if self.loop:
+                self.position = 0
+                self._start = None
+            else:
+                self.finished = True
+
+    def read_sensor(self, aggregate=None):
+        self._advance(step=True)
+        return super().read_sensor(aggregate)
+
+    def read_batch(self, since_seq=0):
+        self._advance()
+        return super().read_batch(since_seq)
+
+    def sample_age(self):
+        self._advance()
+        return super().sample_age()
+
+
 class DummyFlexController:
     def __init__(self):
         # No repeated logging here; error is already logged in the try/except block.
-        pass
+        # Same attributes the game reads off a real controller, so it can stand in for one anywhere
+        self.sensor_names = default_sensor_names()
+        self.channel_count = len(self.sensor_names)
+        self.sensor_values = np.zeros(self.channel_count, dtype=np.int64)
+        self.thresholds = np.zeros(self.channel_count)
+        self.current_sensor = self.channel_count # Nothing to calibrate
+        self.drift = None
+        self.telemetry = None
+        self.active = np.zeros(self.channel_count, dtype=bool)
+        self.transitions = np.zeros(self.channel_count, dtype=np.int64)
+        self.connected = False
 
-    def read_sensor(self):
+    def read_sensor(self, aggregate=None):
         # Return a safe default sensor value.
         return [0, 0, 0, 0]
 
@@ -209,10 +564,62 @@ class DummyFlexController:
         # Return safe default outputs.
         return [0, 0, 0, 0]
 
+    def sensor_velocities(self):
+        return [0.0, 0.0, 0.0, 0.0]
+
+    def effective_thresholds(self):
+        # No drift correction without a sleeve.
+        return self.thresholds
+
     def cal_reset(self):
         # Dummy method does nothing.
         pass
 
     def cal_save(self):
         # Dummy method does nothing.
-        pass
\ No newline at end of file
+        pass
+
+    def start_verification(self, thresholds, rounds=1, tolerance=0.15):
+        # Nothing to verify without a sleeve.
+        pass
+
+    def close(self):
+        # Dummy method does nothing.
+        pass
+
+
+def count_transitions(path, thresholds, hysteresis=0.0, min_hold=0.0, threshold_multiplier=0.9):
+    """On/off changes per channel when a recorded session is run through a Debouncer, one sample at a time."""
+    log = load_log(path)
+    values = np.asarray(log["values"], dtype=np.int64)
+    thresholds = np.asarray(thresholds, dtype=float)
+    cutoffs = thresholds * threshold_multiplier
+    direction_channels = list(DEFAULT_CHANNEL_MAP.values())
+    cutoffs[direction_channels] = DirectionClassifier(thresholds, direction_channels, threshold_multiplier).cutoffs
+    debouncer = Debouncer(values.shape[1], hysteresis, min_hold)
+    for row, arrival_time in zip(values, log["time"]):
+        debouncer.update(row, cutoffs, arrival_time)
+    return debouncer.transitions
+
+
+if __name__ == "__main__":
+    # Flicker on a recorded session (see --record in game.py) with and without hysteresis, e.g.
+    #   python FlexController.py session.log --thresholds 800 750 700 820 --hysteresis 0.1 --min-hold 0.1
+    parser = argparse.ArgumentParser(description="Measures how much hysteresis and hold time cut down on/off flicker")
+    parser.add_argument("log", help="sensor log recorded with --record")
+    parser.add_argument("--thresholds", type=float, nargs="+", help="calibrated thresholds, default: 90th percentile of each channel")
+    parser.add_argument("--hysteresis", type=float, default=0.1)
+    parser.add_argument("--min-hold", type=float, default=0.1, help="seconds")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    thresholds = args.thresholds
+    if thresholds is None:
+        thresholds = np.percentile(load_log(args.log)["values"], 90, axis=0)
+        print(f"No thresholds given, using {np.round(thresholds).astype(int).tolist()}")
+    before = count_transitions(args.log, thresholds)
+    after = count_transitions(args.log, thresholds, args.hysteresis, args.min_hold)
+    print(f"transitions without hysteresis: {before.tolist()} (total {before.sum()})")
+    print(f"with hysteresis {args.hysteresis}, hold {args.min_hold} s: {after.tolist()} (total {after.sum()})")
+    if before.sum():
+        print(f"{1 - after.sum() / before.sum():.0%} fewer transitions")
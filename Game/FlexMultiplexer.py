@@ -0,0 +1,141 @@
+"""
+One reader thread for any number of sleeves (two ankles, or two patients on one PC).
+
+All ports are opened non-blocking and watched with selectors, so the thread only wakes up when one of them has data.
+Each sleeve gets its own FlexController view (a controller without a port of its own), so the game code
+can treat it like a single sleeve. Windows COM ports can't be selected on, there the ports are polled instead.
+
+    mux = FlexMultiplexer(["/dev/ttyACM0", "/dev/ttyACM1"])
+    left, right = mux.views
+    outputs = left.sensor_outputs()
+
+    python FlexMultiplexer.py --bench 8 --rate 200   # emulated load test
+"""
+
+import argparse
+import logging
+import os
+import selectors
+import threading
+import time
+from collections import deque
+
+import serial
+
+from FlexController import FlexController
+
+
+class FlexMultiplexer:
+    def __init__(self, ports, baud=9600, buffer_size=1024, **controller_args):
+        """ports is a list of port names, device ids are their positions in it. Extra arguments go to each view."""
+        self.ports = list(ports)
+        self.arduinos = []
+        self.views = [] # FlexController per device, fed by this reader
+        self.samples = deque(maxlen=buffer_size) # Merged stream of (device id, arrival time, values)
+        self._lock = threading.Lock()
+        self._selector = selectors.DefaultSelector() if os.name != "nt" else None
+        for device_id, port in enumerate(self.ports):
+            arduino = serial.Serial(port, baud, timeout=0)
+            view = FlexController(port=None, **controller_args)
+            view.device_id = device_id
+            self.arduinos.append(arduino)
+            self.views.append(view)
+            if self._selector is not None:
+                self._selector.register(arduino.fileno(), selectors.EVENT_READ, device_id)
+        self._running = True
+        self._thread = threading.Thread(target=self._read_loop, daemon=True)
+        self._thread.start()
+
+    def _read_loop(self):
+        while self._running:
+            if self._selector is not None:
+                ready = [key.data for key, _ in self._selector.select(timeout=0.1)]
+            else:
+                ready = [i for i in range(len(self.arduinos)) if self._waiting(i)]
+                if not ready:
+                    time.sleep(0.001)
+            for device_id in ready:
+                self._service(device_id)
+
+    def _waiting(self, device_id):
+        """Polling (Windows): whether a device has bytes to read. One failing doesn't stop the others."""
+        if not self.views[device_id].connected:
+            return False
+        try:
+            return self.arduinos[device_id].in_waiting > 0
+        except (serial.SerialException, OSError) as e:
+            self._failed(device_id, e)
+            return False
+
+    def _failed(self, device_id, error):
+        if self._running:
+            logging.error(f"Sleeve {device_id} on {self.ports[device_id]} failed: {error}")
+            self.views[device_id].error = error
+            if self._selector is not None:
+                self._selector.unregister(self.arduinos[device_id].fileno())
+
+    def _service(self, device_id):
+        arduino, view = self.arduinos[device_id], self.views[device_id]
+        try:
+            data = os.read(arduino.fileno(), 65536) if self._selector is not None else arduino.read(arduino.in_waiting)
+            if not data:
+                raise serial.SerialException("device disconnected")
+        except (serial.SerialException, OSError) as e:
+            self._failed(device_id, e)
+            return
+        values, device_seqs = view.decoder.feed(data)
+        if len(values):
+            arrival_time = time.perf_counter()
+            view._store_samples(values, arrival_time, device_seqs)
+            with self._lock:
+                self.samples.extend((device_id, arrival_time, row) for row in values.tolist())
+
+    def close(self):
+        self._running = False
+        self._thread.join(timeout=1)
+        if self._selector is not None:
+            self._selector.close()
+        for arduino, view in zip(self.arduinos, self.views):
+            view.close()
+            arduino.close()
+
+
+def bench(devices=8, rate=200, duration=5.0, fps=60):
+    """Emulates `devices` sleeves at `rate` Hz and runs a 60 FPS loop reading every view, counting late frames."""
+    from ArduinoEmulator import ArduinoEmulator
+
+    emulators = [ArduinoEmulator("flex", rate=rate, seed=i).start() for i in range(devices)]
+    mux = FlexMultiplexer([e.port for e in emulators])
+    for view in mux.views:
+        view.thresholds = [600, 600, 600, 600]
+    budget = 1 / fps
+    frame_times = []
+    start = next_frame = time.perf_counter()
+    while time.perf_counter() - start < duration:
+        t = time.perf_counter()
+        for view in mux.views:
+            view.sensor_outputs()
+        frame_times.append(time.perf_counter() - t)
+        next_frame += budget
+        time.sleep(max(0.0, next_frame - time.perf_counter()))
+    late = sum(1 for t in frame_times if t > budget)
+    received = [view.sample_seq for view in mux.views]
+    sent = [e.sent for e in emulators]
+    mux.close()
+    for e in emulators:
+        e.stop()
+
+    print(f"{devices} sleeves at {rate} Hz for {duration:.0f} s")
+    print(f"samples received per sleeve: min {min(received)}, max {max(received)} (sent ~{min(sent)})")
+    print(f"sensor read time per frame: mean {sum(frame_times) / len(frame_times) * 1000:.3f} ms, "
+          f"max {max(frame_times) * 1000:.3f} ms, frames over budget: {late}/{len(frame_times)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Multi-sleeve reader load test")
+    parser.add_argument("--bench", type=int, default=8, metavar="DEVICES", help="number of emulated sleeves")
+    parser.add_argument("--rate", type=float, default=200, help="samples per second per sleeve")
+    parser.add_argument("--duration", type=float, default=5.0)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    bench(args.bench, args.rate, args.duration)
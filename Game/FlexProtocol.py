@@ -0,0 +1,135 @@
+"""
+Decoding of the byte stream sent by ArduinoFlexController.ino.
+
+Two formats are understood and told apart automatically:
+- Text: one line per sample, space-separated integers ('512 300 610 898'). This is the original format.
+- Binary frames: SYNC (0xA5 0x5A), sequence counter (1 byte), channel count (1 byte),
+  the channels packed as 10-bit values MSB first, then a checksum (sum of seq, count and payload bytes, mod 256).
+  Four channels fit in 5 payload bytes, so one frame is 10 bytes instead of up to 17 characters of text.
+0xA5 is never sent in text mode, so seeing the sync header is enough to switch to binary decoding.
+"""
+
+import logging
+import numpy as np
+
+SYNC = b"\xA5\x5A"
+HEADER_SIZE = 4 # sync, seq, channel count
+BINARY_BAUD = 115200 # Baud rate ArduinoFlexController.ino uses when BINARY_FRAMES is on
+
+_BIT_WEIGHTS = 1 << np.arange(9, -1, -1) # 512, 256, ... 1 for turning 10 bits back into an int
+
+
+def frame_size(channels):
+    """Size in bytes of a binary frame carrying the given number of channels."""
+    return HEADER_SIZE + (channels * 10 + 7) // 8 + 1
+
+
+def pack_frame(seq, values):
+    """Builds one binary frame, same layout as the Arduino sketch writes."""
+    payload = bytearray()
+    acc, bits = 0, 0
+    for v in values:
+        acc = (acc << 10) | (int(v) & 0x3FF)
+        bits += 10
+        while bits >= 8:
+            payload.append((acc >> (bits - 8)) & 0xFF)
+            bits -= 8
+    if bits:
+        payload.append((acc << (8 - bits)) & 0xFF)
+    body = bytes([seq & 0xFF, len(values)]) + bytes(payload)
+    return SYNC + body + bytes([sum(body) & 0xFF])
+
+
+class SampleDecoder:
+    """
+    Turns raw serial bytes into samples. feed() can be given any chunk of bytes, incomplete lines or frames
+    are kept until the rest arrives.
+    """
+    def __init__(self, channels=4):
+        self.channels = channels
+        self.mode = None # "text" or "binary", decided by what the stream looks like
+        self.bad_frames = 0 # Frames dropped for a bad checksum or header, each one costs a resync
+        self._buffer = b""
+        self._bytes_since_frame = 0
+
+    def feed(self, data):
+        """
+        Decodes as many complete samples as possible.
+        Returns (values, seqs): values is an int array of shape (samples, channels), seqs the device
+        sequence counters for binary frames (None in text mode).
+        """
+        self._buffer += data
+        if self.mode != "binary" and SYNC in self._buffer:
+            logging.info("Binary sensor frames detected")
+            self.mode = "binary"
+        elif self.mode is None and b"\n" in self._buffer:
+            self.mode = "text"
+
+        if self.mode == "binary":
+            values, seqs = self._decode_frames()
+            self._bytes_since_frame = 0 if len(values) else self._bytes_since_frame + len(data)
+            if self._bytes_since_frame > 256:
+                # No valid frame for a long while, the sketch was probably switched back to text output
+                logging.info("No binary sensor frames, detecting format again")
+                self.mode = None
+                self._bytes_since_frame = 0
+            return values, seqs
+        return self._decode_lines(), None
+
+    def _decode_lines(self):
+        *lines, self._buffer = self._buffer.split(b"\n")
+        rows = []
+        for line in lines:
+            values = [int(v) for v in line.decode(errors="ignore").split() if v.isdigit()]
+            if len(values) >= self.channels:
+                rows.append(values[:self.channels])
+        return np.array(rows, dtype=np.int64).reshape(-1, self.channels)
+
+    def _decode_frames(self):
+        buf = np.frombuffer(self._buffer, dtype=np.uint8)
+        values, seqs = [], []
+        pos = 0
+        while True:
+            start = self._buffer.find(SYNC, pos)
+            if start < 0:
+                # Keep a trailing 0xA5 in case it's the first half of the next sync
+                pos = len(buf) - 1 if self._buffer.endswith(SYNC[:1]) else len(buf)
+                break
+            if start + HEADER_SIZE > len(buf):
+                pos = start
+                break
+            count = int(buf[start + 3])
+            if count != self.channels:
+                self.bad_frames += 1
+                pos = start + 1
+                continue
+            size = frame_size(count)
+            # Frames normally arrive back to back, so check the whole aligned run in one go
+            run = (len(buf) - start) // size
+            if run == 0:
+                pos = start
+                break
+            frames = buf[start:start + run * size].reshape(run, size)
+            checksum = frames[:, 2:-1].sum(axis=1, dtype=np.uint32) & 0xFF
+            ok = (frames[:, 0] == SYNC[0]) & (frames[:, 1] == SYNC[1]) & (frames[:, 3] == count) & (checksum == frames[:, -1])
+            bad = np.flatnonzero(~ok)
+            good = run if len(bad) == 0 else int(bad[0])
+            if good:
+                values.append(self._unpack(frames[:good], count))
+                seqs.append(frames[:good, 2].astype(np.int64))
+            pos = start + good * size
+            if good == run:
+                break
+            # Corrupted frame, look for the next sync after its first byte
+            self.bad_frames += 1
+            pos += 1
+        self._buffer = self._buffer[pos:]
+        if not values:
+            return np.empty((0, self.channels), dtype=np.int64), np.empty(0, dtype=np.int64)
+        return np.concatenate(values), np.concatenate(seqs)
+
+    @staticmethod
+    def _unpack(frames, count):
+        payload = frames[:, HEADER_SIZE:-1]
+        bits = np.unpackbits(payload, axis=1)[:, :count * 10].reshape(len(frames), count, 10)
+        return bits.astype(np.int64) @ _BIT_WEIGHTS
@@ -0,0 +1,143 @@
+"""
+Hot-plug handling for the sensor sleeve.
+
+FlexSupervisor stands in for a FlexController (attribute access is passed through to whichever controller is live)
+and watches it from a background thread. When the sleeve is unplugged or goes quiet it keeps retrying with
+exponential backoff, and once the sleeve is back it swaps a new controller in with the old thresholds.
+Nothing here ever blocks the game loop: while the sleeve is gone, the old controller just reports no reading.
+"""
+
+import logging
+import threading
+import time
+
+from FlexController import FlexController, DummyFlexController
+from PortDiscovery import find_sleeve, forget_cached_port, DEFAULT_BAUDS
+
+CONNECTED, RECONNECTING, DISCONNECTED = "connected", "reconnecting", "disconnected"
+
+
+class FlexSupervisor:
+    def __init__(self, port=None, baud=None, stall_timeout=2.0, boot_timeout=5.0, min_backoff=0.5, max_backoff=8.0, **controller_args):
+        """
+        port=None finds the sleeve with PortDiscovery on every attempt. baud=None lets discovery try the text and
+        binary frame baud rates (9600 with a fixed port). stall_timeout is how long (seconds) the
+        sleeve can stay silent before it's treated as unplugged, boot_timeout how long to wait for the first sample
+        after the port opens (opening resets the Arduino, which takes a few seconds to boot). Extra arguments go to
+        FlexController.
+        """
+        self.port = port
+        self.baud = baud
+        self.stall_timeout = stall_timeout
+        self.boot_timeout = boot_timeout
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.controller_args = controller_args
+
+        self.controller = DummyFlexController() # Until the first connection is made
+        self.state = DISCONNECTED
+        self.reconnects = 0 # Successful reconnections after a lost connection
+        self.record_path = None # Sensor log that every connected controller keeps appending to
+        self._ever_connected = False
+        self._connected_at = None
+        self._use_port_cache = True # Off from a failed connection to the next good one, the cached port may be something else now
+        self._failure_logged = False # Only the first failed attempt after each loss is a warning, retries are debug
+        self._running = True
+        self._thread = threading.Thread(target=self._supervise, daemon=True)
+        self._thread.start()
+        self._ready = True # Attributes set from here on belong to the controller, see __setattr__
+
+    def __getattr__(self, name):
+        # Only called for attributes the supervisor doesn't have itself
+        return getattr(self.__dict__["controller"], name)
+
+    def __setattr__(self, name, value):
+        # e.g. flex_controller.thresholds = [...] has to reach the live controller, not the supervisor
+        if "_ready" in self.__dict__ and name not in self.__dict__:
+            setattr(self.controller, name, value)
+        else:
+            object.__setattr__(self, name, value)
+
+    @property
+    def connected(self):
+        return self.state == CONNECTED
+
+    def _lost(self, controller):
+        if not controller.connected:
+            return True
+        age = controller.sample_age()
+        if age is None: # Nothing at all yet, give the Arduino time to boot after the port opened
+            return time.perf_counter() - self._connected_at > self.boot_timeout
+        return age > self.stall_timeout
+
+    def _supervise(self):
+        backoff = self.min_backoff
+        next_attempt = 0
+        while self._running:
+            if self.state == CONNECTED:
+                if self._lost(self.controller):
+                    logging.warning("Sleeve connection lost, reconnecting in the background")
+                    self.state = RECONNECTING
+                    self.controller.close()
+                    self._forget_port()
+                    backoff, next_attempt = self.min_backoff, time.perf_counter()
+            elif time.perf_counter() >= next_attempt:
+                controller = self._connect()
+                if controller is not None and self._running:
+                    controller.adopt_settings(self.controller)
+                    if self.record_path and controller.recorder is None:
+                        controller.start_recording(self.record_path)
+                    self.controller = controller
+                    self._connected_at = time.perf_counter()
+                    self.reconnects += int(self._ever_connected)
+                    self._ever_connected = True
+                    self.state = CONNECTED
+                    self._use_port_cache = True # find_sleeve() has cached the port that just worked
+                    self._failure_logged = False
+                    logging.info("Sleeve connected")
+                elif controller is not None:
+                    controller.close()
+                else:
+                    next_attempt = time.perf_counter() + backoff
+                    backoff = min(backoff * 2, self.max_backoff)
+            time.sleep(0.1)
+
+    def start_recording(self, path):
+        """Records the sleeve's samples to a log, carrying on across reconnections."""
+        self.record_path = path
+        if isinstance(self.controller, FlexController):
+            self.controller.start_recording(path)
+
+    def stop_recording(self):
+        self.record_path = None
+        if isinstance(self.controller, FlexController):
+            self.controller.stop_recording()
+
+    def _connect(self):
+        try:
+            port, baud = self.port, self.baud or DEFAULT_BAUDS[0]
+            if port is None:
+                port, baud = find_sleeve((self.baud,) if self.baud else DEFAULT_BAUDS, use_cache=self._use_port_cache)
+            if port is None:
+                return None
+            return FlexController(port, baud, **self.controller_args)
+        except Exception as e:
+            if self._failure_logged:
+                logging.debug(f"Connecting to the sleeve failed: {e}")
+            else:
+                logging.warning(f"Connecting to the sleeve failed, retrying in the background: {e}")
+                self._failure_logged = True
+            self._forget_port()
+            return None
+
+    def _forget_port(self):
+        """After a failed or stalled connection, search every port next time instead of trusting the cache."""
+        if self.port is None:
+            if self._use_port_cache:
+                forget_cached_port()
+            self._use_port_cache = False
+
+    def close(self):
+        self._running = False
+        self._thread.join(timeout=1)
+        self.controller.close()
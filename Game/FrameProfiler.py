@@ -0,0 +1,143 @@
+"""
+Where each frame's time goes, phase by phase.
+
+The game loop calls start_frame() at the top, mark(phase) at the end of each phase and end_frame() after the
+clock tick. mark() adds the time since the previous mark to that phase, so a phase can be marked more than
+once a frame (e.g. the background and the sprites both count as "draw"). Times come from perf_counter_ns().
+The overlay shows the last frames as stacked bars against the 60 FPS budget, with p50/p95 per phase, and the
+whole session can be written out as a per-frame CSV trace for a closer look.
+Off unless game.py is started with --profile-frames (or --frame-trace), DummyFrameProfiler does nothing.
+"""
+
+import logging
+import time
+
+import numpy as np
+import pygame
+
+from LatencyMonitor import RollingPercentiles
+
+# In loop order. "idle" is the clock tick waiting out the rest of the frame, time to spare.
+PHASES = ["events", "sensors", "update", "collisions", "draw", "hud", "display", "idle"]
+PHASE_COLORS = [(200, 200, 200), (255, 140, 0), (80, 160, 255), (255, 60, 60), (60, 200, 60), (200, 80, 255),
+                (255, 230, 0), (110, 110, 110)]
+BUDGET_MS = 1000 / 60
+
+
+class FrameProfiler:
+    def __init__(self, window=600, trace_path=None, chunk=3600, width=240, height=80):
+        """window is how many frames the percentiles cover, trace_path where end_session() writes the trace."""
+        self.index = {phase: i for i, phase in enumerate(PHASES)}
+        self.stats = [RollingPercentiles(window) for _ in PHASES]
+        self.frame_stats = RollingPercentiles(window)
+        self.times = [0] * len(PHASES) # ns spent in each phase this frame
+        self.last_times = [0] * len(PHASES) # and in the last finished frame
+        self.frames = 0
+        self._frame_start = None
+        self._last = None
+
+        # Trace rows (frame start, each phase, whole frame, all in ns) in preallocated chunks
+        self.trace_path = trace_path
+        self.chunk = chunk
+        self._chunks = []
+        self._row = chunk
+
+        # Overlay: a graph that scrolls one bar per frame, and the legend, re-rendered a few times a second
+        self.width = width
+        self.height = height
+        self.graph = pygame.Surface((width, height), pygame.SRCALPHA)
+        self.legend = []
+
+    def start_frame(self):
+        self._frame_start = self._last = time.perf_counter_ns()
+        self.times = [0] * len(PHASES)
+
+    def mark(self, phase):
+        """Counts the time since the last mark (or the frame start) towards phase."""
+        now = time.perf_counter_ns()
+        self.times[self.index[phase]] += now - self._last
+        self._last = now
+
+    def end_frame(self):
+        if self._frame_start is None:
+            return
+        total = self._last - self._frame_start # Up to the last mark, the profiler's own bookkeeping stays out
+        for stats, ns in zip(self.stats, self.times):
+            stats.add(ns / 1e6)
+        self.frame_stats.add(total / 1e6)
+        self.last_times = self.times
+        self.frames += 1
+        if self.trace_path is not None:
+            if self._row == self.chunk:
+                self._chunks.append(np.zeros((self.chunk, len(PHASES) + 2), dtype=np.int64))
+                self._row = 0
+            row = self._chunks[-1][self._row]
+            row[0] = self._frame_start
+            row[1:-1] = self.times
+            row[-1] = total
+            self._row += 1
+
+    def summary(self):
+        """{phase: [p50, p95, p99]} in milliseconds, plus "frame" for whole frames."""
+        report = {phase: stats.percentiles() for phase, stats in zip(PHASES, self.stats)}
+        report["frame"] = self.frame_stats.percentiles()
+        return report
+
+    def draw(self, surface, font, x, y):
+        """Draws the stacked bar graph with its top left corner at (x, y) and the legend to its left."""
+        bar, scale = 2, self.height / (BUDGET_MS * 2) # The graph goes up to two frame budgets
+        self.graph.scroll(-bar, 0)
+        self.graph.fill((0, 0, 0, 140), (self.width - bar, 0, bar, self.height))
+        bottom = self.height
+        for ns, color in zip(self.last_times, PHASE_COLORS):
+            h = ns / 1e6 * scale
+            if h >= 0.5:
+                top = max(bottom - h, 0)
+                self.graph.fill(color, (self.width - bar, round(top), bar, round(bottom) - round(top)))
+                bottom = top
+        surface.blit(self.graph, (x, y))
+        budget_y = y + self.height - round(BUDGET_MS * scale)
+        pygame.draw.line(surface, (255, 255, 255), (x, budget_y), (x + self.width - 1, budget_y))
+
+        if self.frames % 15 == 0 or not self.legend:
+            self.legend = [font.render(f"{phase:10} {p50:5.1f} {p95:5.1f}", True, color)
+                           for (phase, (p50, p95, _)), color in zip(self.summary().items(), PHASE_COLORS + [(255, 255, 255)])]
+        for i, text in enumerate(self.legend):
+            surface.blit(text, (x - text.get_width() - 6, y + i * font.get_linesize()))
+
+    def end_session(self):
+        """Logs the percentiles and writes the trace, if there is one. Returns the trace path (or None)."""
+        if not self.frames:
+            return None
+        logging.info("Frame time p50/p95/p99 (ms): " +
+                     ", ".join(f"{phase} {p50:.2f}/{p95:.2f}/{p99:.2f}" for phase, (p50, p95, p99) in self.summary().items()))
+        if self.trace_path is None:
+            return None
+        rows = np.concatenate(self._chunks)[:(len(self._chunks) - 1) * self.chunk + self._row]
+        start = rows[0, 0]
+        with open(self.trace_path, "w") as f:
+            f.write(",".join(["frame", "start_ms"] + [f"{phase}_ms" for phase in PHASES] + ["frame_ms"]) + "\n")
+            for i, row in enumerate(rows.tolist()):
+                f.write(",".join([str(i), f"{(row[0] - start) / 1e6:.3f}"] + [f"{ns / 1e6:.3f}" for ns in row[1:]]) + "\n")
+        logging.info(f"Frame trace ({len(rows)} frames) saved to {self.trace_path}")
+        return self.trace_path
+
+
+class DummyFrameProfiler:
+    """Stands in when profiling is off, so the game loop doesn't need to check."""
+    frames = 0
+
+    def start_frame(self):
+        pass
+
+    def mark(self, phase):
+        pass
+
+    def end_frame(self):
+        pass
+
+    def draw(self, surface, font, x, y):
+        pass
+
+    def end_session(self):
+        return None
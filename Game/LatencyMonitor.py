@@ -0,0 +1,72 @@
+"""
+Sensor-to-screen latency measurements.
+
+Every sample is stamped with time.perf_counter() when it arrives from the sleeve. The game loop then records
+how old that sample is when sensor_outputs() classifies it, when Player.move_with_sensors() moves the ship,
+and when pygame.display.update() puts the frame on screen.
+"""
+
+import json
+import time
+
+import numpy as np
+
+STAGES = ["outputs", "move", "display"]
+
+
+class RollingPercentiles:
+    """Keeps the last `size` measurements in a preallocated array and answers percentile queries over them."""
+    def __init__(self, size=600):
+        self.window = np.zeros(size)
+        self.count = 0
+
+    def add(self, value):
+        self.window[self.count % len(self.window)] = value
+        self.count += 1
+
+    def values(self):
+        return self.window[:min(self.count, len(self.window))]
+
+    def percentiles(self, qs=(50, 95, 99)):
+        values = self.values()
+        if not len(values):
+            return [0.0] * len(qs)
+        return np.percentile(values, qs).tolist()
+
+    def histogram(self, bins):
+        counts, edges = np.histogram(self.values(), bins=bins)
+        return counts.tolist(), edges.tolist()
+
+
+class LatencyMonitor:
+    """Rolling latency statistics for each stage between a sample arriving and the frame showing it."""
+    def __init__(self, window=600):
+        self.stages = {stage: RollingPercentiles(window) for stage in STAGES}
+
+    def record(self, stage, sample_time, now=None):
+        """Records how long ago (in ms) the sample stamped sample_time arrived."""
+        if sample_time is None:
+            return
+        now = time.perf_counter() if now is None else now
+        self.stages[stage].add((now - sample_time) * 1000)
+
+    def summary(self):
+        """{stage: [p50, p95, p99]} in milliseconds."""
+        return {stage: stats.percentiles() for stage, stats in self.stages.items()}
+
+    def draw(self, surface, font, x, y, color=(255, 255, 255)):
+        """Draws a small p50/p95/p99 table for each stage with its top right corner at (x, y)."""
+        for i, (stage, (p50, p95, p99)) in enumerate(self.summary().items()):
+            text = font.render(f"{stage:8} {p50:5.1f} {p95:5.1f} {p99:5.1f} ms", True, color)
+            surface.blit(text, (x - text.get_width(), y + i * (text.get_height() + 2)))
+
+    def dump(self, path, bins=(0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)):
+        """Writes the percentiles and a latency histogram of each stage to a JSON file."""
+        report = {}
+        for stage, stats in self.stages.items():
+            counts, edges = stats.histogram(list(bins))
+            p50, p95, p99 = stats.percentiles()
+            report[stage] = {"samples": min(stats.count, len(stats.window)), "p50_ms": p50, "p95_ms": p95, "p99_ms": p99,
+                             "histogram_ms": {"edges": edges, "counts": counts}}
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
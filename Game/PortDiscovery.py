@@ -0,0 +1,125 @@
+"""
+Finds the serial port the sensor sleeve is plugged into.
+
+All candidate ports are probed at the same time, so a full scan takes about one probe timeout no matter how many
+ports there are. A port counts as the sleeve once it sends sensor samples (four readings per line, or binary frames).
+Each port is tried at every baud rate given, by default the text rate and then BINARY_BAUD, since a sleeve sending
+binary frames only talks at the faster rate. The winning port and baud rate are cached, and on the next launch
+they are used straight away if the port is still plugged in. If the cached port then fails to connect or goes
+quiet, forget_cached_port() drops it so the next search scans again.
+"""
+
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError
+
+import serial
+from serial.tools import list_ports
+
+from FlexProtocol import SampleDecoder, BINARY_BAUD
+
+PORT_CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "FlexController_Port.json")
+DEFAULT_BAUDS = (9600, BINARY_BAUD)
+
+
+def candidate_ports():
+    """Serial ports currently present, USB ones first since that's where an Arduino will be."""
+    ports = list_ports.comports()
+    ports.sort(key=lambda p: p.vid is None)
+    return [p.device for p in ports]
+
+
+def probe_port(port, baud=9600, timeout=2.5, samples_needed=2):
+    """True if the port sends sleeve samples within timeout seconds. Opening resets most Arduinos, hence the long default."""
+    decoder = SampleDecoder(channels=4)
+    found = 0
+    try:
+        with serial.Serial(port, baud, timeout=0.05) as arduino:
+            deadline = time.perf_counter() + timeout
+            while time.perf_counter() < deadline:
+                values, _ = decoder.feed(arduino.read(arduino.in_waiting or 1))
+                found += int(((values >= 0) & (values <= 1023)).all(axis=1).sum())
+                if found >= samples_needed:
+                    return True
+    except (serial.SerialException, OSError) as e:
+        logging.debug(f"Probing {port} failed: {e}")
+    return False
+
+
+def probe_bauds(port, bauds, timeout=2.5):
+    """The first of the baud rates the port sends sleeve samples at, or None."""
+    for baud in bauds:
+        if probe_port(port, baud, timeout):
+            return baud
+    return None
+
+
+def load_cached_port():
+    """(port, baud) of the last sleeve found, baud is None in caches from before it was saved."""
+    try:
+        with open(PORT_CACHE_FILE) as f:
+            cache = json.load(f)
+        return cache.get("port"), cache.get("baud")
+    except (OSError, ValueError, AttributeError):
+        return None, None
+
+
+def save_cached_port(port, baud=None):
+    try:
+        with open(PORT_CACHE_FILE, "w") as f:
+            json.dump({"port": port, "baud": baud}, f)
+    except OSError as e:
+        logging.warning(f"Could not cache sleeve port: {e}")
+
+
+def forget_cached_port():
+    try:
+        os.remove(PORT_CACHE_FILE)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logging.warning(f"Could not remove cached sleeve port: {e}")
+
+
+def find_sleeve(bauds=DEFAULT_BAUDS, timeout=2.5, use_cache=True):
+    """Returns the sleeve's (port name, baud rate), or (None, None) if no port answered within the timeout."""
+    ports = candidate_ports()
+    cached, cached_baud = load_cached_port() if use_cache else (None, None)
+    if cached in ports and (cached_baud in bauds or (cached_baud is None and len(bauds) == 1)):
+        baud = cached_baud or bauds[0]
+        logging.info(f"Using cached sleeve port {cached} at {baud} baud")
+        return cached, baud
+    if not ports:
+        logging.warning("No serial ports found")
+        return None, None
+
+    logging.info(f"Probing serial ports for the sleeve at {'/'.join(map(str, bauds))} baud: {', '.join(ports)}")
+    pool = ThreadPoolExecutor(max_workers=len(ports))
+    futures = {pool.submit(probe_bauds, port, bauds, timeout): port for port in ports}
+    found, found_baud = None, None
+    try:
+        for future in as_completed(futures, timeout=timeout * len(bauds) + 1):
+            if future.result():
+                found, found_baud = futures[future], future.result()
+                break
+    except TimeoutError:
+        pass
+    # Don't wait for the slower probes, they close their ports on their own once they time out
+    # (cancelled by hand, shutdown()'s cancel_futures needs Python 3.9)
+    for future in futures:
+        future.cancel()
+    pool.shutdown(wait=False)
+
+    if found is None:
+        logging.warning("No sleeve found on any serial port")
+    else:
+        logging.info(f"Found sleeve on {found} at {found_baud} baud")
+        save_cached_port(found, found_baud)
+    return found, found_baud
+
+
+def find_sleeve_port(baud=9600, timeout=2.5, use_cache=True):
+    """Returns the sleeve's port name at a known baud rate, or None if no port answered within the timeout."""
+    return find_sleeve((baud,), timeout, use_cache)[0]
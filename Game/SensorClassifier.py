@@ -0,0 +1,209 @@
+"""
+Turns sensor readings into the four direction outputs [up, down, left, right].
+
+DirectionClassifier holds everything that only changes with calibration (cutoffs, gains) as arrays, so
+classifying is just arithmetic: classify() does a whole buffer of samples at once, classify_one() is the
+quick path sensor_outputs() uses for the one sample per frame. Both give exactly the outputs of the original
+sensor_outputs() logic, kept below as legacy_sensor_outputs(). Check that and measure the speed with:
+    python SensorClassifier.py --samples 2000000
+
+velocity_tables() is for proportional movement instead: how far each sensor is flexed, as a speed.
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+# Per-direction tweaks: "up" needs a higher threshold, "right" a lower one and a boost.
+# These are the defaults, CalibrationFit.py can fit them to a patient's recorded sessions.
+THRESHOLD_GAINS = np.array([1.1, 1.0, 1.0, 0.85])
+STRENGTH_GAINS = np.array([1.0, 1.0, 1.0, 1.2])
+UP, DOWN, LEFT, RIGHT = range(4)
+
+# Two sensors active at once: (first, second, stronger, weaker) means output both directions when first and
+# second are active and stronger beats weaker. Checked in order, only the first match counts.
+DIAGONALS = [(UP, LEFT, UP, DOWN), (UP, RIGHT, UP, DOWN), (DOWN, LEFT, DOWN, UP), (DOWN, RIGHT, DOWN, UP)]
+RIGHT_OVER_UP = 0.8 # With up and right both active, right alone wins if it's at least this strong relative to up
+
+
+class DirectionClassifier:
+    def __init__(self, thresholds, direction_channels=(0, 1, 2, 3), threshold_multiplier=0.9,
+                 threshold_gains=THRESHOLD_GAINS, strength_gains=STRENGTH_GAINS):
+        """
+        thresholds has one entry per channel, direction_channels is the channel for [up, down, left, right].
+        threshold_gains and strength_gains are the per-direction tweaks, [up, down, left, right].
+        """
+        self.direction_channels = np.asarray(direction_channels)
+        self.cutoffs = (np.asarray(thresholds, dtype=float)[self.direction_channels] * threshold_multiplier *
+                        np.asarray(threshold_gains, dtype=float))
+        self.scales = np.maximum(self.cutoffs, 1) # Strength is how far above the cutoff, relative to it
+        self.gains = np.asarray(strength_gains, dtype=float)
+        # Plain floats for classify_one(), scalar numpy arithmetic would be slower than Python's
+        self._channels = self.direction_channels.tolist()
+        self._terms = list(zip(self.cutoffs.tolist(), self.scales.tolist(), self.gains.tolist()))
+        self.last_strengths = [0.0, 0.0, 0.0, 0.0] # Of the last classify_one() call
+
+    def strengths(self, samples):
+        """Strength of each direction for every sample (one row per sample, one column per channel)."""
+        samples = np.atleast_2d(np.asarray(samples, dtype=float))
+        return (samples[:, self.direction_channels] - self.cutoffs) / self.scales * self.gains
+
+    def classify(self, samples, active=None):
+        """
+        Direction outputs for a whole buffer of samples, as a boolean array with one row per sample.
+        active (same shape) can say which directions count as active, by default those with a positive strength.
+        """
+        strengths = self.strengths(samples)
+        active = strengths > 0 if active is None else np.asarray(active, dtype=bool)
+        outputs = np.zeros(strengths.shape, dtype=bool)
+
+        # The strongest active direction
+        rows = np.nonzero(active.any(axis=1))[0]
+        strongest = np.where(active, strengths, -np.inf).argmax(axis=1)
+        outputs[rows, strongest[rows]] = True
+
+        # Up and right together: right alone if it's strong enough, otherwise one of the diagonals
+        right_only = active[:, UP] & active[:, RIGHT] & (strengths[:, RIGHT] >= RIGHT_OVER_UP * strengths[:, UP])
+        outputs[right_only] = [False, False, False, True]
+        pending = ~right_only
+        for first, second, stronger, weaker in DIAGONALS:
+            match = active[:, first] & active[:, second] & (strengths[:, stronger] > strengths[:, weaker])
+            hit = pending & match
+            outputs[hit, first] = True
+            outputs[hit, second] = True
+            pending &= ~match
+        return outputs
+
+    def classify_one(self, values, active=None):
+        """Direction outputs [up, down, left, right] as 0/1 for a single sample."""
+        if isinstance(values, np.ndarray):
+            values = values.tolist()
+        strengths = [(values[c] - cutoff) / scale * gain for c, (cutoff, scale, gain) in zip(self._channels, self._terms)]
+        self.last_strengths = strengths
+        if active is None:
+            active = [s > 0 for s in strengths]
+
+        strongest = -1
+        for i in range(4):
+            if active[i] and (strongest < 0 or strengths[i] > strengths[strongest]):
+                strongest = i
+        outputs = [0, 0, 0, 0]
+        if strongest < 0:
+            return outputs # No sensors are active
+        outputs[strongest] = 1
+
+        if active[UP] and active[RIGHT] and strengths[RIGHT] >= RIGHT_OVER_UP * strengths[UP]:
+            return [0, 0, 0, 1]
+        for first, second, stronger, weaker in DIAGONALS:
+            if active[first] and active[second] and strengths[stronger] > strengths[weaker]:
+                outputs[first] = 1
+                outputs[second] = 1
+                break
+        return outputs
+
+
+def velocity_tables(thresholds, dead_zone=0.5, curve=1.5, levels=1024):
+    """
+    One lookup table per channel from raw reading (0-1023) to speed (0 to 1), built from the calibrated thresholds.
+    Readings below dead_zone * threshold don't move at all, at the threshold (a full flex) it's full speed.
+    curve > 1 gives finer control over small flexes, 1 is linear. Uncalibrated channels (threshold 0) never move.
+    """
+    thresholds = np.asarray(thresholds, dtype=float)[:, None]
+    start = thresholds * dead_zone
+    readings = np.arange(levels)
+    tables = np.clip((readings - start) / np.maximum(thresholds - start, 1), 0, 1) ** curve
+    tables[thresholds[:, 0] <= 0] = 0
+    return tables
+
+
+def legacy_sensor_outputs(values, thresholds, threshold_multiplier=0.9):
+    """The original sensor_outputs() logic for four channels, kept to check DirectionClassifier against."""
+    outputs = [0, 0, 0, 0]
+    up_val, down_val, left_val, right_val = values
+    up_thresh, down_thresh, left_thresh, right_thresh = [t * threshold_multiplier for t in thresholds]
+    up_thresh = up_thresh * 1.1
+    right_thresh = right_thresh * 0.85
+    up_strength = (up_val - up_thresh) / max(up_thresh, 1)
+    down_strength = (down_val - down_thresh) / max(down_thresh, 1)
+    left_strength = (left_val - left_thresh) / max(left_thresh, 1)
+    right_strength = (right_val - right_thresh) / max(right_thresh, 1)
+    right_strength = right_strength * 1.2
+    strengths = {0: up_strength, 1: down_strength, 2: left_strength, 3: right_strength}
+    if all(strength < 0 for strength in strengths.values()):
+        return outputs
+    active_sensors = {i: s for i, s in strengths.items() if s > 0}
+    if active_sensors:
+        strongest_sensor = max(active_sensors.items(), key=lambda x: x[1])[0]
+        outputs[strongest_sensor] = 1
+    if up_strength > 0 and right_strength > 0 and right_strength >= 0.8 * up_strength:
+        outputs = [0, 0, 0, 1]
+    elif up_strength > 0 and left_strength > 0 and up_strength > down_strength:
+        outputs[0] = 1
+        outputs[2] = 1
+    elif up_strength > 0 and right_strength > 0 and up_strength > down_strength:
+        outputs[0] = 1
+        outputs[3] = 1
+    elif down_strength > 0 and left_strength > 0 and down_strength > up_strength:
+        outputs[1] = 1
+        outputs[2] = 1
+    elif down_strength > 0 and right_strength > 0 and down_strength > up_strength:
+        outputs[1] = 1
+        outputs[3] = 1
+    return outputs
+
+
+def check_equivalence(samples=2_000_000, per_calibration=10_000, seed=0):
+    """Compares classify() and classify_one() with the legacy logic on random samples and calibrations."""
+    rng = np.random.default_rng(seed)
+    mismatches = 0
+    for start in range(0, samples, per_calibration):
+        n = min(per_calibration, samples - start)
+        # Some calibrations with zero or equal thresholds, to hit the max(.., 1) and tie cases
+        thresholds = rng.choice([0, 1, 512, rng.integers(0, 1024)], 4) if rng.random() < 0.2 else rng.integers(0, 1024, 4)
+        multiplier = 0.9 if rng.random() < 0.5 else rng.uniform(0.5, 1.2)
+        values = rng.integers(0, 1024, (n, 4))
+        values[: n // 4] = rng.choice([0, 300, 512, 600, 1023], (n // 4, 4)) # Plenty of ties between channels
+        classifier = DirectionClassifier(thresholds, threshold_multiplier=multiplier)
+        batch = classifier.classify(values).astype(int).tolist()
+        for row, batch_outputs in zip(values.tolist(), batch):
+            expected = legacy_sensor_outputs(row, thresholds.tolist(), multiplier)
+            if batch_outputs != expected or classifier.classify_one(row) != expected:
+                mismatches += 1
+                if mismatches <= 5:
+                    print(f"mismatch: values {row}, thresholds {thresholds.tolist()} x{multiplier}: "
+                          f"legacy {expected}, classify {batch_outputs}, classify_one {classifier.classify_one(row)}")
+    print(f"{samples} random samples: {mismatches} mismatches")
+    return mismatches == 0
+
+
+def bench(samples=200_000):
+    """Samples per second for the legacy logic, classify_one() and classify() on buffers of several sizes."""
+    values = np.random.randint(0, 1024, (samples, 4))
+    thresholds = [600, 550, 500, 650]
+    classifier = DirectionClassifier(thresholds)
+    rows = values[:20000].tolist()
+
+    t = time.perf_counter()
+    for row in rows:
+        legacy_sensor_outputs(row, thresholds)
+    print(f"{'legacy, one sample':26} {len(rows) / (time.perf_counter() - t):12.0f} samples/s")
+    t = time.perf_counter()
+    for row in rows:
+        classifier.classify_one(row)
+    print(f"{'classify_one':26} {len(rows) / (time.perf_counter() - t):12.0f} samples/s")
+    for n in (1, 10, 100, 10000):
+        t = time.perf_counter()
+        for i in range(0, samples if n > 1 else 20000, n):
+            classifier.classify(values[i:i + n])
+        done = samples if n > 1 else 20000
+        print(f"{f'classify, {n} per call':26} {done / (time.perf_counter() - t):12.0f} samples/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Checks DirectionClassifier against the legacy logic and benchmarks it")
+    parser.add_argument("--samples", type=int, default=2_000_000, help="random samples for the equivalence check")
+    args = parser.parse_args()
+    ok = check_equivalence(args.samples)
+    bench()
+    raise SystemExit(0 if ok else 1)
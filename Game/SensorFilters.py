@@ -0,0 +1,186 @@
+"""
+Streaming filters for the sensor samples, run on every batch between the serial port and sensor_outputs().
+
+Each filter takes a batch with one row per sample and one column per channel, and carries its state over to
+the next batch, so filtering in batches gives the same result as filtering one sample at a time.
+Filters are given as short specs, e.g. FlexController(filters=["median:5", "ema:0.3"]):
+- "ema:ALPHA"         exponential moving average, ALPHA between 0 (smooth) and 1 (no smoothing)
+- "median:WINDOW"     moving median over the last WINDOW samples, removes single-sample spikes
+- "lowpass:HZ"        first order IIR low-pass with cutoff HZ
+- "lowpass2:HZ"       second order (Butterworth) IIR low-pass, steeper than lowpass
+
+Smoothing always costs latency. Run this file to see what each filter costs per sample and how many
+milliseconds it delays a flex (the time for the output to get half way up a step):
+    python SensorFilters.py --rate 20
+"""
+
+import argparse
+import math
+import time
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+class IIRFilter:
+    """Direct form II transposed IIR filter over each channel. b and a are the usual coefficients, a[0] == 1."""
+    def __init__(self, b, a, channels=4):
+        self.b = np.asarray(b, dtype=float) / a[0]
+        self.a = np.asarray(a, dtype=float) / a[0]
+        self.order = max(len(self.a), len(self.b)) - 1
+        self.b = np.pad(self.b, (0, self.order + 1 - len(self.b)))
+        self.a = np.pad(self.a, (0, self.order + 1 - len(self.a)))
+        self.channels = channels
+        self.state = None # (order, channels), primed from the first sample so there's no ramp up from zero
+
+    def reset(self):
+        self.state = None
+
+    def process(self, batch):
+        batch = np.asarray(batch, dtype=float)
+        if not len(batch):
+            return batch
+        b, a, state = self.b, self.a, self.state
+        if state is None:
+            # Steady state for a constant input equal to the first sample
+            state = np.zeros((self.order, batch.shape[1]))
+            gain = b.sum() / a.sum()
+            for i in range(self.order - 1, -1, -1):
+                state[i] = (b[i + 1:].sum() - gain * a[i + 1:].sum()) * batch[0]
+        out = np.empty_like(batch)
+        # Loops over samples only, every channel is handled at once
+        for k, x in enumerate(batch):
+            y = b[0] * x + state[0]
+            for i in range(self.order - 1):
+                state[i] = b[i + 1] * x - a[i + 1] * y + state[i + 1]
+            state[-1] = b[-1] * x - a[-1] * y
+            out[k] = y
+        self.state = state
+        return out
+
+
+class EMAFilter(IIRFilter):
+    def __init__(self, alpha, channels=4):
+        if not 0 < alpha <= 1:
+            raise ValueError("EMA alpha has to be between 0 and 1")
+        super().__init__([alpha], [1, alpha - 1], channels)
+
+
+class LowPassFilter(IIRFilter):
+    """First order low-pass (bilinear transform of an RC filter) with its cutoff in Hz."""
+    def __init__(self, cutoff, rate, channels=4):
+        k = math.tan(math.pi * min(cutoff, rate * 0.45) / rate)
+        super().__init__([k / (1 + k), k / (1 + k)], [1, (k - 1) / (k + 1)], channels)
+
+
+class ButterworthFilter(IIRFilter):
+    """Second order Butterworth low-pass with its cutoff in Hz."""
+    def __init__(self, cutoff, rate, channels=4):
+        w0 = 2 * math.pi * min(cutoff, rate * 0.45) / rate
+        alpha = math.sin(w0) / math.sqrt(2) # sin(w0) / (2Q) with Q = 1/sqrt(2)
+        cos_w0 = math.cos(w0)
+        b = [(1 - cos_w0) / 2, 1 - cos_w0, (1 - cos_w0) / 2]
+        a = [1 + alpha, -2 * cos_w0, 1 - alpha]
+        super().__init__(b, a, channels)
+
+
+class MedianFilter:
+    """Moving median over the last `window` samples of each channel."""
+    def __init__(self, window=5, channels=4):
+        if window < 1:
+            raise ValueError("Median window has to be at least 1 sample")
+        self.window = window
+        self.channels = channels
+        self.history = None # Last window - 1 samples of the previous batch
+
+    def reset(self):
+        self.history = None
+
+    def process(self, batch):
+        batch = np.asarray(batch, dtype=float)
+        if not len(batch):
+            return batch
+        if self.history is None:
+            self.history = np.repeat(batch[:1], self.window - 1, axis=0)
+        extended = np.concatenate([self.history, batch])
+        self.history = extended[len(extended) - (self.window - 1):]
+        # One window per new sample, all medians in one call
+        return np.median(sliding_window_view(extended, self.window, axis=0), axis=-1)
+
+
+def make_filter(spec, channels=4, rate=20):
+    """Builds a filter from a spec like "ema:0.3" (see the module docstring). rate is the sample rate in Hz."""
+    if not isinstance(spec, str):
+        return spec # Already a filter
+    name, _, arg = spec.partition(":")
+    try:
+        value = float(arg)
+    except ValueError:
+        raise ValueError(f"Filter spec {spec!r} needs a number, e.g. ema:0.3") from None
+    if name == "ema":
+        return EMAFilter(value, channels)
+    if name == "median":
+        return MedianFilter(int(value), channels)
+    if name == "lowpass":
+        return LowPassFilter(value, rate, channels)
+    if name == "lowpass2":
+        return ButterworthFilter(value, rate, channels)
+    raise ValueError(f"Unknown filter {name!r}, pick one of ema, median, lowpass, lowpass2")
+
+
+class FilterPipeline:
+    """Runs the filters one after the other. Output is rounded back to whole readings like the raw samples."""
+    def __init__(self, specs, channels=4, rate=20):
+        self.specs = list(specs)
+        self.filters = [make_filter(spec, channels, rate) for spec in self.specs]
+
+    def reset(self):
+        for f in self.filters:
+            f.reset()
+
+    def process(self, batch):
+        for f in self.filters:
+            batch = f.process(batch)
+        return np.rint(batch).astype(np.int64)
+
+
+def step_latency(specs, rate=20, low=300, high=850):
+    """Milliseconds until the output of the pipeline gets half way through a step from low to high."""
+    pipeline = FilterPipeline(specs, channels=1, rate=rate)
+    pipeline.process(np.full((50, 1), low))
+    out = pipeline.process(np.full((int(rate * 10), 1), high))[:, 0]
+    crossed = np.nonzero(out >= (low + high) / 2)[0]
+    return crossed[0] * 1000 / rate if len(crossed) else math.inf
+
+
+def noise_reduction(specs, rate=20, noise=5, samples=5000, seed=0):
+    """Standard deviation of the output over that of the input, for readings with gaussian noise at rest."""
+    rng = np.random.default_rng(seed)
+    noisy = 500 + rng.normal(0, noise, (samples, 4))
+    out = FilterPipeline(specs, rate=rate).process(noisy)[100:]
+    return out.std(axis=0).mean() / noisy[100:].std(axis=0).mean()
+
+
+def bench(specs, rate=20, batch_sizes=(1, 10, 100), samples=20000):
+    """Prints the cost per sample, step latency and noise reduction of each filter."""
+    print(f"{'filter':12} " + " ".join(f"{f'us/sample @{n}':>15}" for n in batch_sizes) + f" {'latency ms':>11} {'noise':>6}")
+    data = np.random.randint(0, 1024, (samples, 4))
+    for spec in specs:
+        costs = []
+        for n in batch_sizes:
+            pipeline = FilterPipeline([spec], rate=rate)
+            t = time.perf_counter()
+            for i in range(0, samples, n):
+                pipeline.process(data[i:i + n])
+            costs.append((time.perf_counter() - t) / samples * 1e6)
+        print(f"{spec:12} " + " ".join(f"{c:15.2f}" for c in costs) +
+              f" {step_latency([spec], rate):11.0f} {noise_reduction([spec], rate):6.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cost and latency of the sensor filters")
+    parser.add_argument("specs", nargs="*", default=["ema:0.5", "ema:0.3", "median:3", "median:5", "lowpass:4", "lowpass2:4"])
+    parser.add_argument("--rate", type=float, default=20, help="sample rate of the sleeve in Hz (latency depends on it)")
+    args = parser.parse_args()
+    print(f"At {args.rate:.0f} samples per second. latency: time to half way up a step, noise: output/input noise\n")
+    bench(args.specs, args.rate)
@@ -0,0 +1,69 @@
+"""
+Compact binary log of raw sensor samples, for recording real sessions and replaying them later.
+
+Layout: a 16 byte header (magic, channel count) followed by fixed-size records of
+(time in seconds since the recording started as float64, one uint16 per channel).
+Logs are read back through a memory map, so hour-long recordings never have to fit in RAM.
+"""
+
+import os
+import struct
+import time
+
+import numpy as np
+
+MAGIC = b"FLXLOG1\0"
+HEADER = struct.Struct("<8sHH4x") # magic, channels, reserved
+
+
+def record_dtype(channels):
+    return np.dtype([("time", "<f8"), ("values", "<u2", (channels,))])
+
+
+def load_log(path):
+    """Memory-maps a log and returns its records (fields "time" and "values")."""
+    with open(path, "rb") as f:
+        magic, channels, _ = HEADER.unpack(f.read(HEADER.size))
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a sensor log")
+    dtype = record_dtype(channels)
+    # Ignore a record that was only half written if the recording was cut short
+    count = (os.path.getsize(path) - HEADER.size) // dtype.itemsize
+    if count == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", offset=HEADER.size, shape=(count,))
+
+
+class SensorRecorder:
+    """Appends timestamped raw samples to a log file. Safe to call from the reader thread."""
+    def __init__(self, path, channels=4):
+        self.path = path
+        self.dtype = record_dtype(channels)
+        self.start_time = time.perf_counter()
+        self.count = 0
+        if os.path.exists(path) and os.path.getsize(path) >= HEADER.size:
+            existing = load_log(path)
+            if existing.dtype != self.dtype:
+                raise ValueError(f"{path} was recorded with a different number of channels")
+            # Carry on the existing timeline so appended samples stay in order
+            count = len(existing)
+            if count:
+                self.start_time -= float(existing["time"][-1])
+            del existing # Release the memory map before resizing the file
+            self.file = open(path, "r+b")
+            self.file.truncate(HEADER.size + count * self.dtype.itemsize)
+            self.file.seek(0, os.SEEK_END)
+        else:
+            self.file = open(path, "wb")
+            self.file.write(HEADER.pack(MAGIC, channels, 0))
+
+    def write(self, values, arrival_time):
+        """Logs a batch of samples (one row per sample) that arrived at arrival_time (time.perf_counter())."""
+        records = np.empty(len(values), dtype=self.dtype)
+        records["time"] = arrival_time - self.start_time
+        records["values"] = values
+        self.file.write(records.tobytes())
+        self.count += len(records)
+
+    def close(self):
+        self.file.close()
@@ -0,0 +1,117 @@
+"""
+In-memory telemetry of what sensor_outputs() saw and decided, frame by frame.
+
+Every frame goes into a preallocated ring of fixed-size records (time, raw values, strengths, outputs), so the
+game loop only copies a few numbers and never formats text or touches the disk. Nothing is turned into text
+until the ring is dumped, e.g. with F5 in game.py right after a patient reports a glitch:
+    telemetry.dump("glitch.csv", seconds=10)
+Compare the cost with the per-frame debug logging it replaced:
+    python SensorTelemetry.py
+"""
+
+import argparse
+import logging
+import time
+
+import numpy as np
+
+
+class SensorTelemetry:
+    def __init__(self, channels=4, size=3600, every=1):
+        """
+        Keeps the last `size` records, a minute of frames at 60 FPS by default. every=N only keeps every Nth
+        frame, for longer history from the same memory.
+        """
+        self.channels = channels
+        self.size = size
+        self.every = max(1, int(every))
+        self.dtype = np.dtype([("time", "<f8"), ("values", "<i4", (channels,)), ("strengths", "<f4", (4,)),
+                               ("outputs", "u1", (4,))])
+        self.records = np.zeros(size, dtype=self.dtype)
+        # Column views, writing a column is quicker than building a record
+        self._time = self.records["time"]
+        self._values = self.records["values"]
+        self._strengths = self.records["strengths"]
+        self._outputs = self.records["outputs"]
+        self.frames = 0 # Frames offered to record()
+        self.count = 0 # Records kept (the ring holds the last `size` of them)
+
+    def record(self, now, values, strengths, outputs):
+        """
+        Called every frame with time.perf_counter(), the raw readings, the direction strengths and outputs. With
+        proportional movement the strengths are the speeds.
+        """
+        self.frames += 1
+        if self.every > 1 and self.frames % self.every:
+            return
+        i = self.count % self.size
+        self._time[i] = now
+        self._values[i] = values
+        self._strengths[i] = strengths
+        self._outputs[i] = outputs
+        self.count += 1
+
+    def last(self, seconds=None):
+        """Copy of the kept records, oldest first. seconds only gives those from the last so many seconds."""
+        n = min(self.count, self.size)
+        start = self.count % self.size if self.count > self.size else 0
+        records = np.roll(self.records, -start)[:n]
+        if seconds is not None and n:
+            records = records[records["time"] >= records["time"][-1] - seconds]
+        return records
+
+    def lines(self, seconds=None, sensor_names=None):
+        """The records as CSV lines (header first), times in seconds before the newest record."""
+        records = self.last(seconds)
+        names = sensor_names or [f"ch{i}" for i in range(self.channels)]
+        yield ",".join(["seconds_ago"] + list(names) + [f"strength_{d}" for d in ("up", "down", "left", "right")] +
+                       [f"out_{d}" for d in ("up", "down", "left", "right")])
+        if not len(records):
+            return
+        ago = records["time"][-1] - records["time"]
+        for t, values, strengths, outputs in zip(ago.tolist(), records["values"].tolist(),
+                                                 records["strengths"].tolist(), records["outputs"].tolist()):
+            yield ",".join([f"{t:.3f}"] + [str(v) for v in values] + [f"{s:.3f}" for s in strengths] +
+                           [str(o) for o in outputs])
+
+    def dump(self, path, seconds=None, sensor_names=None):
+        """Writes the records (all, or the last `seconds`) to a CSV file. Returns how many were written."""
+        count = 0
+        with open(path, "w") as f:
+            for count, line in enumerate(self.lines(seconds, sensor_names)):
+                f.write(line + "\n")
+        return count
+
+
+def bench(frames=100_000):
+    """Per-frame cost of record() against the three debug f-strings sensor_outputs() used to log."""
+    values = np.array([512, 300, 250, 700])
+    strengths = [0.1234, -0.5, -0.6, 0.25]
+    outputs = [1, 0, 0, 0]
+    logging.getLogger().setLevel(logging.INFO) # Debug records filtered out, the f-strings are still built
+
+    t = time.perf_counter()
+    for _ in range(frames):
+        logging.debug(f"Sensor values: {values}")
+        logging.debug(f"Strengths: {strengths}")
+        logging.debug(f"Outputs: {outputs}")
+    old = (time.perf_counter() - t) / frames * 1e6
+
+    telemetry = SensorTelemetry(4)
+    t = time.perf_counter()
+    for _ in range(frames):
+        telemetry.record(t, values, strengths, outputs)
+    new = (time.perf_counter() - t) / frames * 1e6
+    print(f"debug logging (filtered out): {old:6.2f} us/frame")
+    print(f"telemetry record():           {new:6.2f} us/frame")
+
+    t = time.perf_counter()
+    lines = sum(1 for _ in telemetry.lines())
+    print(f"formatting {lines - 1} records on dump: {(time.perf_counter() - t) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cost of sensor telemetry per frame")
+    parser.add_argument("--frames", type=int, default=100_000)
+    args = parser.parse_args()
+    bench(args.frames)
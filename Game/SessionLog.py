@@ -0,0 +1,229 @@
+"""
+Per-frame record of a whole play session, for clinicians and analytics jobs.
+
+Layout: a 16 byte header (magic, format version, channel count, metadata length), the metadata as JSON (patient,
+sensor names, movement mode...), then chunks. Each chunk is an 8 byte header (b"CHNK", row count) followed by
+every column in turn, one contiguous array per column, so a reader can pull single columns out of months of
+sessions without touching the rest. Columns are listed in session_columns().
+
+SessionWriter fills preallocated chunks on the game loop and hands full ones to a writer thread through a
+bounded queue, so the game never waits on the disk and memory use stays fixed. load_session() memory-maps a file
+and gives each column as a view into it. Summarise sessions (or benchmark the writer) with:
+    python SessionLog.py sessions/*.session
+    python SessionLog.py --bench
+"""
+
+import argparse
+import json
+import logging
+import os
+import queue
+import struct
+import threading
+import time
+
+import numpy as np
+
+MAGIC = b"FLXSES1\0"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<8sHHI") # magic, version, channels, metadata length
+CHUNK = struct.Struct("<4sI") # b"CHNK", rows
+
+
+def session_columns(channels=4):
+    """(name, dtype, shape of one row) of every column, in the order they're stored."""
+    return [
+        ("time", "<f8", ()), # Seconds since the session started
+        ("frame", "<u4", ()),
+        ("values", "<u2", (channels,)), # Raw sensor readings
+        ("thresholds", "<f4", (channels,)),
+        ("outputs", "<f4", (4,)), # [up, down, left, right], 0/1 or speeds with proportional movement
+        ("player", "<i2", (4,)), # Player rect x, y, width, height
+        ("enemies", "<u2", ()),
+        ("hits", "<u2", ()), # Asteroids shot this frame
+        ("player_hit", "u1", ()), # The ship crashed into an asteroid this frame
+        ("score", "<u4", ()),
+        ("lives", "<i1", ()),
+        ("level", "u1", ()),
+    ]
+
+
+class SessionWriter:
+    def __init__(self, path, channels=4, meta=None, chunk_rows=600, max_chunks=8):
+        """
+        Frames are written chunk_rows at a time (10 s at 60 FPS). At most max_chunks chunks are ever allocated,
+        if the disk can't keep up frames are dropped (and counted) rather than using more memory.
+        """
+        self.path = path
+        self.channels = channels
+        self.columns = session_columns(channels)
+        self.chunk_rows = chunk_rows
+        self.start_time = time.perf_counter()
+        self.frames = 0 # Frames given to record()
+        self.dropped = 0 # Frames lost because every chunk was waiting for the disk
+        self.written = 0 # Rows on disk
+
+        meta = json.dumps(dict(meta or {}, format=FORMAT_VERSION, columns=[c[0] for c in self.columns])).encode()
+        self.file = open(path, "wb")
+        self.file.write(HEADER.pack(MAGIC, FORMAT_VERSION, channels, len(meta)))
+        self.file.write(meta)
+
+        self._free = queue.Queue() # Empty chunks ready for the game loop
+        self._full = queue.Queue() # Chunks for the writer thread, (chunk, rows) or None to stop
+        for _ in range(max_chunks):
+            self._free.put({name: np.zeros((chunk_rows,) + shape, dtype=dtype) for name, dtype, shape in self.columns})
+        self._chunk = self._free.get()
+        self._row = 0
+        self._thread = threading.Thread(target=self._write_chunks, daemon=True)
+        self._thread.start()
+
+    def record(self, values, thresholds, outputs, player, enemies, hits, player_hit, score, lives, level, now=None):
+        """Adds one frame. player is the player's rect (x, y, width, height)."""
+        self.frames += 1
+        if self._chunk is None:
+            try:
+                self._chunk = self._free.get_nowait()
+            except queue.Empty:
+                self.dropped += 1
+                return
+        chunk, i = self._chunk, self._row
+        chunk["time"][i] = (time.perf_counter() if now is None else now) - self.start_time
+        chunk["frame"][i] = self.frames
+        chunk["values"][i] = values[:self.channels]
+        chunk["thresholds"][i] = thresholds[:self.channels]
+        chunk["outputs"][i] = outputs
+        chunk["player"][i] = player
+        chunk["enemies"][i] = enemies
+        chunk["hits"][i] = hits
+        chunk["player_hit"][i] = player_hit
+        chunk["score"][i] = score
+        chunk["lives"][i] = lives
+        chunk["level"][i] = level
+        self._row += 1
+        if self._row == self.chunk_rows:
+            self._flush()
+
+    def _flush(self):
+        if self._chunk is not None and self._row:
+            self._full.put((self._chunk, self._row))
+            self._chunk = None
+        self._row = 0
+
+    def _write_chunks(self):
+        while True:
+            item = self._full.get()
+            if item is None:
+                return
+            chunk, rows = item
+            try:
+                self.file.write(CHUNK.pack(b"CHNK", rows))
+                for name, _, _ in self.columns:
+                    self.file.write(chunk[name][:rows].tobytes())
+                self.file.flush()
+                self.written += rows
+            except OSError as e:
+                logging.error(f"Writing session log {self.path} failed: {e}")
+            self._free.put(chunk)
+
+    def close(self):
+        """Writes what's left and waits for the writer thread."""
+        self._flush()
+        self._full.put(None)
+        self._thread.join()
+        self.file.close()
+        if self.dropped:
+            logging.warning(f"Session log {self.path}: {self.dropped} frames dropped, the disk couldn't keep up")
+        logging.info(f"Session log saved to {self.path} ({self.written} frames)")
+
+
+class SessionFile:
+    """A memory-mapped session log. Columns are views into the file, nothing is read until it's used."""
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            magic, version, self.channels, meta_length = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a session log")
+            if version > FORMAT_VERSION:
+                raise ValueError(f"{path} was written by a newer version of the game")
+            self.meta = json.loads(f.read(meta_length))
+        self.columns = session_columns(self.channels)
+        size = os.path.getsize(path)
+        self._map = np.memmap(path, dtype=np.uint8, mode="r") if size else None
+        self.chunks = []
+
+        offset = HEADER.size + meta_length
+        while offset + CHUNK.size <= size:
+            tag, rows = CHUNK.unpack(bytes(self._map[offset:offset + CHUNK.size]))
+            if tag != b"CHNK":
+                break
+            offset += CHUNK.size
+            chunk = {}
+            for name, dtype, shape in self.columns:
+                dtype = np.dtype(dtype)
+                nbytes = rows * dtype.itemsize * int(np.prod(shape, dtype=int))
+                if offset + nbytes > size:
+                    return # Chunk cut short (the game was killed mid-write), keep the complete ones
+                chunk[name] = self._map[offset:offset + nbytes].view(dtype).reshape((rows,) + shape)
+                offset += nbytes
+            self.chunks.append(chunk)
+
+    def __len__(self):
+        return sum(len(chunk["frame"]) for chunk in self.chunks)
+
+    def column(self, name):
+        """The whole column as one array (copied together from the chunks)."""
+        if not self.chunks:
+            dtype, shape = next((np.dtype(d), s) for n, d, s in self.columns if n == name)
+            return np.zeros((0,) + shape, dtype=dtype)
+        if len(self.chunks) == 1:
+            return self.chunks[0][name]
+        return np.concatenate([chunk[name] for chunk in self.chunks])
+
+
+def load_session(path):
+    return SessionFile(path)
+
+
+def summarize(path):
+    session = load_session(path)
+    frames = len(session)
+    if not frames:
+        return f"{path}: empty"
+    times = session.column("time")
+    outputs = session.column("outputs")
+    active = (outputs > 0).mean(axis=0) * 100
+    return (f"{path}: patient {session.meta.get('patient')}, {frames} frames over {times[-1] - times[0]:.0f} s, "
+            f"score {int(session.column('score').max())}, {int(session.column('hits').sum())} asteroids shot, "
+            f"{int(session.column('player_hit').sum())} crashes, "
+            f"directions active up/down/left/right {active[0]:.0f}/{active[1]:.0f}/{active[2]:.0f}/{active[3]:.0f}% of frames")
+
+
+def bench(frames=360_000, path="bench.session"):
+    """Game loop cost of record() per frame, and how quickly a single column reads back."""
+    writer = SessionWriter(path, meta={"patient": "bench"})
+    values = np.array([512, 300, 250, 700])
+    thresholds = np.array([800.0, 750, 700, 820])
+    outputs = [1, 0, 0, 0]
+    t = time.perf_counter()
+    for i in range(frames):
+        writer.record(values, thresholds, outputs, (300, 200, 40, 40), 5, 0, 0, i // 60, 3, 1)
+    record_us = (time.perf_counter() - t) / frames * 1e6
+    writer.close()
+    print(f"record(): {record_us:.2f} us/frame, {writer.dropped} dropped, {os.path.getsize(path) / frames:.0f} bytes/frame")
+    t = time.perf_counter()
+    score = load_session(path).column("score")
+    print(f"read one column of {len(score)} frames: {(time.perf_counter() - t) * 1000:.1f} ms")
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarises session logs recorded with --session-dir")
+    parser.add_argument("sessions", nargs="*")
+    parser.add_argument("--bench", action="store_true", help="measure the writer and reader instead")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if args.bench:
+        bench()
+    for path in args.sessions:
+        print(summarize(path))
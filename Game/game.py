@@ -1,10 +1,46 @@
-import pygame, sys, os, json, random, time, math, logging
+import pygame, sys, os, json, random, time, math, logging, argparse
 from pygame.locals import *
-from FlexController import FlexController, DummyFlexController
+from FlexController import DummyFlexController, ReplayFlexController
+from LatencyMonitor import LatencyMonitor
+from FrameProfiler import FrameProfiler, DummyFrameProfiler
+from SessionLog import SessionWriter
+from CaptureSession import CaptureSession, code_regions
+from FlexSupervisor import FlexSupervisor
+from CalibrationProfiles import ProfileStore, calibration_record, apply_profile, safe_patient_id
 
 script_dir = os.path.dirname(os.path.abspath(__file__))
 parent_dir = os.path.dirname(script_dir)
 sys.path.append(parent_dir)
+
+# Launch options
+parser = argparse.ArgumentParser(description="Asteroid Blaster")
+parser.add_argument("--port", help="serial port of the sleeve (found automatically if not given)")
+parser.add_argument("--baud", type=int, help="baud rate of the sleeve, 115200 for binary frames (tried automatically if not given, 9600 with --port)")
+parser.add_argument("--replay", metavar="LOG", help="play back a recorded sensor log instead of reading the sleeve")
+parser.add_argument("--replay-speed", type=float, default=1.0, help="replay speed, 2 = twice as fast, 0 = as fast as possible")
+parser.add_argument("--record", metavar="LOG", help="record every raw sensor sample to a log file")
+parser.add_argument("--filter", action="append", metavar="SPEC", help="smooth the sensor samples, e.g. --filter median:5 --filter ema:0.3 (see SensorFilters.py)")
+parser.add_argument("--patient", default="default", help="whose calibration profile to load and save")
+parser.add_argument("--verify", action="store_true", help="calibrate button only checks the saved thresholds (one round per sensor)")
+parser.add_argument("--movement", choices=["binary", "proportional"], default="binary",
+                    help="binary: fixed speed once a sensor passes its threshold, proportional: speed follows how far the foot flexes")
+parser.add_argument("--hysteresis", type=float, default=0.1, help="how far (fraction) below its cutoff a sensor has to drop to switch off again")
+parser.add_argument("--min-hold", type=float, default=0.1, help="seconds a sensor stays on or off before it can switch again")
+parser.add_argument("--drift-correction", type=float, default=60, metavar="SECONDS",
+                    help="follow sensor drift at rest with this time constant (0 turns it off)")
+parser.add_argument("--telemetry-size", type=int, default=3600, help="frames of sensor telemetry kept in memory for F5 (0 turns it off)")
+parser.add_argument("--telemetry-every", type=int, default=1, metavar="N", help="only keep every Nth frame in the telemetry")
+parser.add_argument("--session-dir", metavar="DIR", help="save a per-frame record of the session (sensors, ship, asteroids, score) in DIR")
+parser.add_argument("--profile-frames", action="store_true", help="time each phase of every frame (F6 shows the overlay)")
+parser.add_argument("--frame-trace", metavar="CSV", help="profile frames and save every frame's phase times to CSV on exit")
+parser.add_argument("--capture", choices=["cpu", "memory", "both"],
+                    help="profile with cProfile (cpu) and/or tracemalloc (memory) from the start, F7 starts/stops a capture any time")
+parser.add_argument("--capture-seconds", type=float, default=60, help="length of a capture, 0 = until F7 or exit")
+parser.add_argument("--bench-spawn", type=int, metavar="N", help="measure how fast sprites spawn (N of each kind) and exit")
+parser.add_argument("--debug", action="store_true", help="log debug messages too")
+parser.add_argument("--sample-rate", type=float, default=20, help="samples per second the sleeve sends, for the low-pass filters")
+args = parser.parse_args()
+logging.basicConfig(level=logging.DEBUG if args.debug else logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
  
 pygame.init() # Initialise Pygame
 
@@ -37,12 +73,35 @@ font = pygame.font.SysFont("lucidaconsole", 60)
 font_mid = pygame.font.SysFont("lucidaconsole", 30)
 font_small = pygame.font.SysFont("Arial", 25)
 font_medium = pygame.font.SysFont("Arial", 30, bold=True)
+font_tiny = pygame.font.SysFont("lucidaconsole", 14)
 game_over = font.render("Game Over", True, WHITE) 
 
 # Resource loading functions
+# Images are decoded once and shared by every sprite that uses them, keyed by (filename, mode)
+image_cache = {}
+rotated_cache = {} # (filename, angle) -> rotated copy, for missiles
+
+def load_image(filename, mode="alpha"):
+    """Load an image from the images directory, converted for fast blitting (mode "alpha" keeps transparency)"""
+    key = (filename, mode)
+    image = image_cache.get(key)
+    if image is None:
+        image = pygame.image.load(os.path.join(images_dir, filename))
+        image = image.convert_alpha() if mode == "alpha" else image.convert()
+        image_cache[key] = image
+    return image
+
 def load_image_convert_alpha(filename):
-    """Load an image with the given filename from the images directory"""
-    return pygame.image.load(os.path.join(images_dir, filename)).convert_alpha()
+    """Load an image with the given filename from the images directory (shared, don't draw on it)"""
+    return load_image(filename, "alpha")
+
+def rotated_image(filename, angle):
+    """The image rotated by angle degrees, each angle is only rotated once"""
+    key = (filename, angle)
+    image = rotated_cache.get(key)
+    if image is None:
+        image = rotated_cache[key] = pygame.transform.rotate(load_image_convert_alpha(filename), angle)
+    return image
 
 def load_sound(filename):
     """Load a sound with the given filename from the sounds directory"""
@@ -61,6 +120,9 @@ difficulty_img = load_image_convert_alpha("difficulty.png")
 lev1_img = load_image_convert_alpha("lev1.png")
 lev2_img = load_image_convert_alpha("lev2.png")
 lev3_img = load_image_convert_alpha("lev3.png")
+# Sprite images, loaded now so spawning never waits on the disk
+for filename in ["asteroid-big.png", "asteroid-normal.png", "asteroid-small.png", "ufo2.png", "missile.png"]:
+    load_image_convert_alpha(filename)
 #Load sounds
 shoot_sound = load_sound('fire.wav')
 explosion_sound = load_sound('die.wav')
@@ -78,6 +140,18 @@ game_paused = False
 menu_state = "main"
 PAUSED = False
 
+# Sensor-to-screen latency (F3 shows the overlay, F4 saves a report)
+latency_monitor = LatencyMonitor()
+show_latency = False
+# Per-phase frame times, only with --profile-frames or --frame-trace (F6 toggles the overlay)
+if args.profile_frames or args.frame_trace:
+    profiler = FrameProfiler(trace_path=args.frame_trace)
+else:
+    profiler = DummyFrameProfiler()
+show_profiler = True
+frame_sample_time = None # Arrival time of the sensor sample that drives this frame, if it's a new one
+last_sample_seq = 0
+
 
 """MENU BUTTONS"""
 class Button():
@@ -112,34 +186,60 @@ def draw_text(text, font, text_col, x, y):
       DISPLAYSURF.blit(img, (x,y))
 
 try:
-    flex_controller = FlexController()  # No loading from file
+    if args.replay:
+        flex_controller = ReplayFlexController(args.replay, speed=args.replay_speed or None, filters=args.filter, sample_rate=args.sample_rate,
+                                               hysteresis=args.hysteresis, min_hold=args.min_hold,
+                                               drift_time_constant=args.drift_correction or None,
+                                               telemetry_size=args.telemetry_size, telemetry_every=args.telemetry_every)
+    else:
+        # Connects (and reconnects after an unplug) in the background, keyboard control works until then
+        flex_controller = FlexSupervisor(port=args.port, baud=args.baud, filters=args.filter, sample_rate=args.sample_rate,
+                                         hysteresis=args.hysteresis, min_hold=args.min_hold,
+                                         drift_time_constant=args.drift_correction or None,
+                                         telemetry_size=args.telemetry_size, telemetry_every=args.telemetry_every)  # No loading from file
+    if args.record:
+        flex_controller.start_recording(args.record)
     using_sensor = True
 except Exception as e:
     logging.error(f"Error initializing FlexController: {e} - Using DummyFlexController")
     flex_controller = DummyFlexController()  
     using_sensor = False
 
+# Thresholds from the patient's last calibration, so they can start playing without calibrating again
+profiles = ProfileStore()
+load_start = time.perf_counter()
+profile = profiles.get(args.patient)
+if profile is not None and apply_profile(flex_controller, profile):
+    logging.info(f"Loaded calibration profile {profile['revision']} for {args.patient} in {(time.perf_counter() - load_start) * 1000:.1f} ms")
+
+# Per-frame session record, read back with SessionLog.load_session()
+session_log = None
+if args.session_dir:
+    os.makedirs(args.session_dir, exist_ok=True)
+    session_path = os.path.join(args.session_dir, time.strftime(f"{safe_patient_id(args.patient)}_%Y%m%d_%H%M%S.session"))
+    session_log = SessionWriter(session_path, flex_controller.channel_count,
+                                meta={"patient": args.patient, "sensor_names": list(flex_controller.sensor_names),
+                                      "movement": args.movement, "replay": args.replay,
+                                      "started": time.strftime("%Y-%m-%dT%H:%M:%S")})
+
 
 # Calibration UI Class
 class CalibrationUI:
     """Hardware calibration interface."""
     def __init__(self, flex_controller):
         self.flex_controller = flex_controller
-        self.steps = [
-            "REST",
-            "UP",
-            "DOWN",
-            "LEFT",
-            "RIGHT",
-            "Calibration complete"
-        ]
         
         self.reset()
         self.flex_controller.cal_reset()
 
+    @property
+    def steps(self):
+        # One step per sensor, looked up each time since a reconnected sleeve can have a different set
+        return ["REST"] + [name.upper() for name in self.flex_controller.sensor_names] + ["Calibration complete"]
+
         
 # self.flex_controller.cal_round is defined as the current calibration round for the current sensor. Needs to trigger FIVE times.
-# self.flex_controller.current_sensor is defined as the current sensor being calibrated. Needs to trigger FOUR TIMES.
+# self.flex_controller.current_sensor is defined as the current sensor being calibrated. Needs to trigger once per sensor.
 
     def draw(self, screen, sensor_values):
         """Display values for all sensors, highlight the active sensors."""
@@ -152,14 +252,15 @@ class CalibrationUI:
         instruction = font.render(self.steps[step_index], True, YELLOW)
         screen.blit(instruction, (SCREEN_WIDTH//2 - instruction.get_width()//2, 80))
 
-        if sensor_values and len(sensor_values) >= 4:
+        channel_count = len(self.flex_controller.sensor_names)
+        if sensor_values is not None and len(sensor_values) >= channel_count:
             y_pos = 150
             bar_width = 300
             bar_height = 25 
             bar_x = SCREEN_WIDTH//2 - bar_width//2
-            spacing = 60
+            spacing = min(60, (SCREEN_HEIGHT - 200) // channel_count) # Squeeze the bars together on sleeves with more sensors
 
-            for i in range(4):
+            for i in range(channel_count):
                 # Draw outline
                 pygame.draw.rect(screen, WHITE, (bar_x, y_pos, bar_width, bar_height),2)
 
@@ -174,6 +275,15 @@ class CalibrationUI:
                 screen.blit(text, (SCREEN_WIDTH//2 - text.get_width()//2, y_pos + bar_height + 5))
                 y_pos += spacing
 
+        # How consistent the last round was, a large spread means the foot didn't hold still
+        summaries = getattr(self.flex_controller, "round_summaries", [])
+        if summaries and summaries[-1]["samples"]:
+            last = summaries[-1]
+            percentile = next(key for key in last if key.startswith("p"))
+            text = font_tiny.render(f"Last round: {percentile} {last[percentile]:.0f}, mean {last['mean']:.0f} ± {last['std']:.0f}, "
+                                    f"{last['samples']} samples", True, WHITE)
+            screen.blit(text, (SCREEN_WIDTH//2 - text.get_width()//2, SCREEN_HEIGHT - 55))
+
         if self.max_time > 0: 
             progress_width = SCREEN_WIDTH - 100
             progress_height = 10
@@ -204,7 +314,7 @@ class CalibrationUI:
         # If calibration is complete (i.e. current_sensor is no longer valid), exit early.
         sensor_values = self.flex_controller.read_sensor()
 
-        if self.flex_controller.current_sensor >= 4:
+        if self.flex_controller.current_sensor >= self.flex_controller.channel_count:
             self.draw(DISPLAYSURF, sensor_values)
             return True
         
@@ -233,7 +343,8 @@ class CalibrationUI:
             self.timer = None  # Start timer for rest phase
             self.max_time = 3000  # 3s
 
-            if self.flex_controller.current_sensor >= 4:
+            if self.flex_controller.current_sensor >= self.flex_controller.channel_count:
+                profiles.save(args.patient, calibration_record(self.flex_controller))
                 return True
 
         return False
@@ -322,6 +433,7 @@ class Player(pygame.sprite.Sprite):
         self.speed = DIFFICULTY_SETTINGS[selected_difficulty]['player_speed']  
         self.missiles = pygame.sprite.Group()
         self.angle = 0
+        self.carry = [0.0, 0.0] # Fractions of a pixel left over from proportional movement
 
     def move_with_keyboard(self, pressed_keys):
         """Move the player using arrow keys."""
@@ -334,11 +446,12 @@ class Player(pygame.sprite.Sprite):
         if pressed_keys[K_RIGHT] and self.rect.right < SCREEN_WIDTH:
             self.rect.move_ip(5, 0)
 
-    def move_with_sensors(self, sensor_values):
+    def move_with_sensors(self, sensor_values, sample_time=None):
         """
         Move the player based on sensor output.
         sensor_values should be a list of four integers: [up, down, left, right].
         If sensor_values is None, we set it to a safe default [0, 0, 0, 0].
+        sample_time is the arrival time of the sample behind sensor_values, for the latency monitor.
         """
         if sensor_values is None or len(sensor_values) < 4:
             sensor_values = [0, 0, 0, 0]
@@ -355,6 +468,24 @@ class Player(pygame.sprite.Sprite):
         elif sensor_values[3] and not sensor_values[2] and self.rect.right < SCREEN_WIDTH:
             self.rect.x += self.speed
 
+        latency_monitor.record("move", sample_time)
+
+    def move_with_velocities(self, velocities, sample_time=None):
+        """
+        Proportional movement: velocities is [up, down, left, right], each from 0 (still) to 1 (full speed),
+        see FlexController.sensor_velocities(). Opposite directions cancel out.
+        """
+        up, down, left, right = velocities
+        dx = (right - left) * self.speed + self.carry[0]
+        dy = (down - up) * self.speed + self.carry[1]
+        # Move whole pixels and keep the rest for the next frame, so slow flexes still add up to movement
+        step_x, step_y = int(dx), int(dy)
+        self.carry = [dx - step_x, dy - step_y]
+        self.rect.move_ip(step_x, step_y)
+        self.rect.clamp_ip(DISPLAYSURF.get_rect())
+
+        latency_monitor.record("move", sample_time)
+
 
     def shoot(self):
         """Create a missile that always fires upward from the player's midtop."""
@@ -376,7 +507,7 @@ class Missile(pygame.sprite.Sprite):
         super().__init__()
         self.original_image = load_image_convert_alpha('missile.png')
         self.angle = angle
-        self.image = pygame.transform.rotate(self.original_image, self.angle)
+        self.image = rotated_image('missile.png', self.angle)
         self.rect = self.image.get_rect(center=position)
         self.speed = 15
         self.direction = [
@@ -415,6 +546,39 @@ def reset_game():
     
     pygame.mixer.music.play(-1)
 
+def draw_hud():
+    """Score, lives and the live sensor readings, drawn over the game."""
+    score_text = font_small.render(f"Score: {SCORE}", True, YELLOW)
+    lives_text = font_small.render(f"Lives: {LIVES}", True, YELLOW)
+    DISPLAYSURF.blit(score_text, (10, 10))
+    DISPLAYSURF.blit(lives_text, (SCREEN_WIDTH-120, 10))
+
+    # Add real time sensor activation to the HUD
+    if using_sensor: 
+        # Create overlay surface with transparency
+        overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
+        overlay.fill((0, 0, 0, 16))
+
+        # Iterate through each sensor and render visual feedback
+        for i in range(len(flex_controller.sensor_names)):
+            name = flex_controller.sensor_names[i]
+            value = flex_controller.sensor_values[i]
+            threshold = flex_controller.thresholds[i]   
+
+            # Use visualize_sensor function to get a visualized string
+            sensor_str = flex_controller.visualize_sensor(name, value, threshold, width=10, active=flex_controller.active[i])
+            text_surface = font_small.render(sensor_str, True, WHITE)
+
+            # Position overlay, adjust coordinates as needed
+            overlay.blit(text_surface, (10, 45 + i * 30))
+
+        # Blit transparent overlay on top of the game screen
+        DISPLAYSURF.blit(overlay, (0, 0))
+
+    if getattr(flex_controller, "state", None) == "reconnecting":
+        warning = font_small.render("Sleeve disconnected - reconnecting...", True, RED)
+        DISPLAYSURF.blit(warning, (SCREEN_WIDTH//2 - warning.get_width()//2, 10))
+
 # Creating Sprites         
 P1 = Player()
 E1 = Enemy_vert()
@@ -430,6 +594,27 @@ all_sprites.add(P1)
 all_sprites.add(E1)
 all_sprites.add(E2)
 
+def bench_spawn(count):
+    """Sprites spawned per second, loading every image from disk (as before the image cache) and from the cache"""
+    kinds = [("Enemy_vert", lambda: Enemy_vert("normal")), ("Enemy_hor", lambda: Enemy_hor("big")),
+             ("Missile", lambda: Missile((350, 250), 0))]
+    for name, spawn in kinds:
+        rates = []
+        for cached in (False, True):
+            start = time.perf_counter()
+            for _ in range(count):
+                if not cached:
+                    image_cache.clear()
+                    rotated_cache.clear()
+                spawn()
+            rates.append(count / (time.perf_counter() - start))
+        print(f"{name:11} {rates[0]:9.0f} spawns/s uncached {rates[1]:9.0f} spawns/s cached ({rates[1] / rates[0]:.0f}x)")
+
+if args.bench_spawn:
+    bench_spawn(args.bench_spawn)
+    pygame.quit()
+    sys.exit()
+
 calibration_ui = CalibrationUI(flex_controller) 
 
 #Adding a new User event 
@@ -446,9 +631,19 @@ GAME_STATES = {
 }
 current_game_state = GAME_STATES["MAIN_MENU"]
 
+# cProfile/tracemalloc captures, memory growth is broken down by sprite class and the HUD
+capture = CaptureSession(os.path.join(script_dir, "captures"),
+                         time.strftime(f"capture_{safe_patient_id(args.patient)}_%Y%m%d_%H%M%S"),
+                         cpu=args.capture in (None, "cpu", "both"), memory=args.capture in (None, "memory", "both"),
+                         seconds=args.capture_seconds, regions=code_regions(Enemy_vert, Enemy_hor, Missile, Player, draw_hud))
+if args.capture:
+    capture.start()
+
 # Game Loop
 run = True
 while run:
+    profiler.start_frame()
+    using_sensor = flex_controller.connected # The sleeve can come and go while the game runs
     # Event handling
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
@@ -467,19 +662,37 @@ while run:
                     reset_game()
             if event.type == KEYDOWN and event.key == K_SPACE and menu_state == "playing" and selected_difficulty == 3:
                 P1.shoot()
+            if event.key == pygame.K_F3:
+                show_latency = not show_latency
+            if event.key == pygame.K_F4:
+                latency_file = os.path.join(script_dir, time.strftime("latency_%Y%m%d_%H%M%S.json"))
+                latency_monitor.dump(latency_file)
+                logging.info(f"Latency report saved to {latency_file}")
+            if event.key == pygame.K_F5 and flex_controller.telemetry is not None:
+                # Right after a glitch: what the sensors read and what the game made of it
+                telemetry_file = os.path.join(script_dir, time.strftime("telemetry_%Y%m%d_%H%M%S.csv"))
+                count = flex_controller.telemetry.dump(telemetry_file, sensor_names=flex_controller.sensor_names)
+                logging.info(f"Sensor telemetry ({count} frames) saved to {telemetry_file}")
+            if event.key == pygame.K_F6:
+                show_profiler = not show_profiler
+            if event.key == pygame.K_F7:
+                capture.toggle()
         if event.type == INC_SPEED and menu_state == "playing":
             SPEED += DIFFICULTY_SETTINGS[selected_difficulty]['speed_inc']
         
         # Calibration events
         if menu_state == "calibration":
-            if flex_controller.current_sensor < 4:
+            if flex_controller.current_sensor < flex_controller.channel_count:
                 calibration_ui.update()
             else:
                 # Calibration complete, transition back to menu
                 menu_state = "difficulty"
 
+    profiler.mark("events")
+
     # Clear the screen and draw the background
     DISPLAYSURF.blit(background, (0, 0))
+    profiler.mark("draw")
 
     if PAUSED:
         # Draw pause screen
@@ -499,6 +712,9 @@ while run:
             
             if calibrate_button.draw():
                 menu_state = "calibration"
+                profile = profiles.get(args.patient)
+                if args.verify and profile is not None:
+                    flex_controller.start_verification(profile["thresholds"])
                 flex_controller.cal_reset()  # Reset calibration process
                 calibration_ui.reset()  # Reset UI state
 
@@ -540,19 +756,35 @@ while run:
             
             if using_sensor:
                 # Use sensor-based control as the default.
-                sensor_vals = flex_controller.sensor_outputs()
-                P1.move_with_sensors(sensor_vals)
+                if args.movement == "proportional":
+                    sensor_vals = flex_controller.sensor_velocities()
+                else:
+                    sensor_vals = flex_controller.sensor_outputs()
+                # Only time a sample on the first frame it drives, later frames reuse it
+                frame_sample_time = None
+                if flex_controller.read_seq != last_sample_seq:
+                    last_sample_seq = flex_controller.read_seq
+                    frame_sample_time = flex_controller.read_time
+                latency_monitor.record("outputs", frame_sample_time)
+                if args.movement == "proportional":
+                    P1.move_with_velocities(sensor_vals, frame_sample_time)
+                else:
+                    P1.move_with_sensors(sensor_vals, frame_sample_time)
             else:
                 # Fallback to keyboard control if FlexController isn't available.
                 pressed_keys = pygame.key.get_pressed()
                 P1.move_with_keyboard(pressed_keys)
+            profiler.mark("sensors")
                 
             all_sprites.update()
+            profiler.mark("update")
 
             # Missile collisions
+            frame_hits = 0
             for missile in P1.missiles.copy():
                 hits = pygame.sprite.spritecollide(missile, enemies, True)
                 if hits:
+                    frame_hits += len(hits)
                     missile.kill()
                     explosion_sound.play()
                     for enemy in hits:
@@ -565,9 +797,17 @@ while run:
                         SCORE += {"big":5, "normal":10, "small":20}[enemy.size]
 
             # Player collision
-            if pygame.sprite.spritecollideany(P1, enemies):
+            player_hit = pygame.sprite.spritecollideany(P1, enemies) is not None
+            if player_hit:
                 explosion_sound.play()
                 LIVES -= 1
+            # Recorded before a game over resets the score
+            if session_log is not None:
+                # The thresholds actually in use, drift correction included
+                session_log.record(flex_controller.sensor_values, flex_controller.effective_thresholds(),
+                                   sensor_vals if using_sensor else (0, 0, 0, 0), tuple(P1.rect), len(enemies),
+                                   frame_hits, player_hit, SCORE, LIVES, selected_difficulty)
+            if player_hit:
                 if LIVES <= 0:
                     # Game Over
                     DISPLAYSURF.fill(TEAL)
@@ -596,38 +836,18 @@ while run:
                     enemy = Enemy_vert('big') if random.random() < 0.5 else Enemy_hor('big')
                     enemies.add(enemy)
                     all_sprites.add(enemy)
+            profiler.mark("collisions")
 
             # Draw game elements
             for entity in all_sprites:
                 DISPLAYSURF.blit(entity.image, entity.rect)
+            profiler.mark("draw")
 
             # Draw HUD
-            score_text = font_small.render(f"Score: {SCORE}", True, YELLOW)
-            lives_text = font_small.render(f"Lives: {LIVES}", True, YELLOW)
-            DISPLAYSURF.blit(score_text, (10, 10))
-            DISPLAYSURF.blit(lives_text, (SCREEN_WIDTH-120, 10))
-
-            # Add real time sensor activation to the HUD
-            if using_sensor: 
-                # Create overlay surface with transparency
-                overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-                overlay.fill((0, 0, 0, 16))
-
-                # Iterate through each sensor and render visual feedback
-                for i in range(4):
-                    name = flex_controller.sensor_names[i]
-                    value = flex_controller.sensor_values[i]
-                    threshold = flex_controller.thresholds[i]   
+            draw_hud()
 
-                    # Use visualize_sensor function to get a visualized string
-                    sensor_str = flex_controller.visualize_sensor(name, value, threshold, width=10)
-                    text_surface = font_small.render(sensor_str, True, WHITE)
-
-                    # Position overlay, adjust coordinates as needed
-                    overlay.blit(text_surface, (10, 45 + i * 30))
-
-                # Blit transparent overlay on top of the game screen
-                DISPLAYSURF.blit(overlay, (0, 0))
+            if show_latency:
+                latency_monitor.draw(DISPLAYSURF, font_tiny, SCREEN_WIDTH - 10, 45)
 
         else:
             # Main menu
@@ -637,9 +857,26 @@ while run:
             else: 
                 draw_text("Press SPACE to Play (Keyboard Mode)", font_mid, YELLOW, 50, 250)
 
+    if show_profiler:
+        profiler.draw(DISPLAYSURF, font_tiny, SCREEN_WIDTH - 250, SCREEN_HEIGHT - 160)
+    profiler.mark("hud") # HUD and menus
+
     # Update the display
     pygame.display.update()
+    latency_monitor.record("display", frame_sample_time)
+    frame_sample_time = None
+    profiler.mark("display")
     FramePerSec.tick(FPS)
-
+    profiler.mark("idle")
+    profiler.end_frame()
+    capture.update()
+
+if flex_controller.drift is not None:
+    logging.info(f"Sensor drift this session: {flex_controller.drift}")
+capture.stop()
+profiler.end_session()
+if session_log is not None:
+    session_log.close()
+flex_controller.close()
 pygame.quit()
 sys.exit()
\ No newline at end of file
@@ -1,8 +1,11 @@
 import serial
+import sys
 import time 
 from pynput.keyboard import Key, Controller 
 
-SerialObject = serial.Serial('COM3', 9600)
+# Port can be given on the command line (e.g. an ArduinoEmulator pty), COM3 otherwise
+PORT = sys.argv[1] if len(sys.argv) > 1 else 'COM3'
+SerialObject = serial.Serial(PORT, 9600)
 SerialObject.timeout = 1
 keyboard = Controller()
 